@@ -7,13 +7,28 @@ interface, but cannot be automatically assessed for correctness.
 STUDENTS SHOULD NOT NEED TO MODIFY THIS CODE.  IT WOULD BE BEST TO TREAT THIS
 FILE AS A BLACK BOX FOR TESTING.
 """
+import bisect
+import contextlib
+import io
+import os
+import pickle
 import random
+import tempfile
+import time
 import unittest
 import timeit
 import sys
+import multiprocessing
+import warnings
 
 import isolation
+import isolation.batch
+import isolation.rollout
 import game_agent
+import opening_book
+import sample_players
+import tournament
+import tuner
 
 from collections import Counter
 from copy import deepcopy
@@ -227,6 +242,31 @@ class Project1Test(unittest.TestCase):
         board.apply_move(loc2)
         return agentUT, board
 
+    def initRandomAUT(self, seed, plies, board_class=isolation.BitBoard, **kwargs):
+        """Generate a player with the keyword arguments of CustomPlayer and a
+        board after a number of random plies drawn from the seed.
+        """
+        agentUT = game_agent.CustomPlayer(**kwargs)
+        agentUT.time_left = lambda: 1e3
+        board = board_class(agentUT, "null_agent")
+        rng = random.Random(seed)
+        for _ in range(plies):
+            board.apply_move(rng.choice(board.get_legal_moves()))
+        return agentUT, board
+
+    def assertVariantsAgree(self, option, values, search, seeds=range(3),
+                            plies=6, **kwargs):
+        """Assert that `search(agent, board)` returns the same results for
+        the reference and the variant value of a CustomPlayer option, on the
+        random positions of all seeds (see `initRandomAUT`).
+        """
+        for seed in seeds:
+            results = []
+            for value in values:
+                kwargs[option] = value
+                results.append(search(*self.initRandomAUT(seed, plies, **kwargs)))
+            self.assertEqual(results[0], results[1])
+
     @timeout(1)
     # @unittest.skip("Skip eval function test.")  # Uncomment this line to skip test
     def test_heuristic(self):
@@ -243,6 +283,41 @@ class Project1Test(unittest.TestCase):
         self.assertIsInstance(game_agent.custom_score(game, player1), float,
             "The heuristic function should return a floating point")
 
+    @timeout(5)
+    def test_longest_path(self):
+        """ Test that the memoized longest path score matches the plain
+        recursion through forecast_move """
+
+        def longest_path(game, player):
+            own_longest_path = 0
+            nme_longest_path = 0
+            if not game.get_legal_moves(player):
+                return 0
+            for move in game.get_legal_moves(player):
+                score = longest_path(game.forecast_move(move), player) + 1
+                own_longest_path = max(own_longest_path, score)
+            opponent = game.get_opponent(player)
+            for move in game.get_legal_moves(opponent):
+                score = longest_path(game.forecast_move(move), opponent) + 1
+                nme_longest_path = max(nme_longest_path, score)
+            return float(own_longest_path - nme_longest_path)
+
+        for seed in (0, 4, 10, 13):
+            rng = random.Random(seed)
+            board = isolation.Board("Player1", "Player2", 5, 5)
+            for _ in range(12):
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            for player in ("Player1", "Player2"):
+                self.assertEqual(
+                    game_agent.scoring_function_longest_path(board, player, 10**6),
+                    longest_path(board, player))
+
+        # beyond the node limit, the difference in mobility is returned
+        self.assertEqual(
+            game_agent.scoring_function_longest_path(board, "Player1", 1),
+            len(board.get_legal_moves("Player1")) -
+            len(board.get_legal_moves("Player2")))
+
     timeout(1)
     # @unittest.skip("Skip simple minimax test.")  # Uncomment this line to skip test
     def test_minimax_interface(self):
@@ -476,6 +551,451 @@ class Project1Test(unittest.TestCase):
             self.assertIn(move, first_branch, WRONG_MOVE.format(
                 method, test_depth, first_branch, move))
 
+    @timeout(30)
+    def test_pvs(self):
+        """ Test CustomPlayer.pvs
+
+        Principal variation search must return the same score and move as
+        alphabeta at every depth, and visit fewer nodes when the moves are
+        ordered from the previous iteration.
+        """
+        from sample_players import improved_score
+
+        nodes = {"alphabeta": 0, "pvs": 0}
+        for seed in range(5):
+            results = {}
+            for method in nodes:
+                agentUT, board = self.initAUT(6, improved_score, False, method)
+                agentUT.ordering = True
+                agentUT.time_left = lambda: 1e3
+                rng = random.Random(seed)
+                for _ in range(4):
+                    board.apply_move(rng.choice(board.get_legal_moves()))
+                results[method] = [getattr(agentUT, method)(board, depth)
+                                   for depth in range(1, 7)]
+                nodes[method] += board.counts[0]
+            self.assertEqual(results["alphabeta"], results["pvs"])
+        self.assertLess(nodes["pvs"], nodes["alphabeta"])
+
+    @timeout(30)
+    def test_aspiration_windows(self):
+        """ Test that aspiration windows do not change iterative scores """
+        def search(agentUT, board):
+            score = None
+            for depth in range(1, 7):
+                score, _ = agentUT.search_window(board, depth, score)
+            return score
+
+        for method in ("alphabeta", "pvs"):
+            self.assertVariantsAgree("aspiration", (None, 0.5), search,
+                                     search_depth=6, iterative=False,
+                                     method=method, inplace=True, ordering=True)
+
+    @timeout(5)
+    def test_get_move_proven_result(self):
+        """ Test that iterative deepening stops on a proven result """
+        for method in ("minimax", "alphabeta", "pvs"):
+            agentUT = game_agent.CustomPlayer(-1, game_agent.custom_score,
+                                              True, method)
+            board = isolation.Board(agentUT, "null_agent", 5, 5)
+            for move in [(0, 0), (4, 4), (1, 2), (3, 2), (2, 4), (1, 3),
+                         (0, 2), (2, 1), (1, 0), (0, 3)]:
+                board.apply_move(move)
+            legal_moves = board.get_legal_moves()
+            # without a proven result the search would never time out
+            move = agentUT.get_move(board, legal_moves, lambda: 1e6)
+            self.assertIn(move, legal_moves)
+
+    @timeout(5)
+    def test_node_budget(self):
+        """ Test that a node budget makes the search independent of time """
+        moves = []
+        for _ in range(2):
+            agentUT = game_agent.CustomPlayer(
+                -1, game_agent.custom_score, True, 'alphabeta',
+                budget=game_agent.NodeBudget(500))
+            board = isolation.Board(agentUT, "null_agent")
+            for move in [(2, 3), (4, 4), (0, 2), (3, 2)]:
+                board.apply_move(move)
+            legal_moves = board.get_legal_moves()
+            moves.append(agentUT.get_move(board, legal_moves, lambda: float("inf")))
+            self.assertEqual(agentUT.budget.searched, 501)
+        self.assertIn(moves[0], legal_moves)
+        self.assertEqual(moves[0], moves[1])
+
+    @timeout(5)
+    def test_polling_time_budget(self):
+        """ Test that the polling budget reads the clock less often than once
+        per node, adapts the interval to the time per node and stops at most
+        `overshoot` milliseconds late """
+        budget = game_agent.PollingTimeBudget(overshoot=1.)
+        agentUT = game_agent.CustomPlayer(timeout=10., budget=budget)
+
+        # A fake clock that advances by a fixed amount per node: 1/64 ms in
+        # the first half of the move, and 1/8 ms in the second half.
+        clock = [100.]
+        agentUT.time_left = lambda: clock[0]
+        budget.start()
+        nodes = 0
+        intervals = set()
+        while True:
+            clock[0] -= 1 / 64. if clock[0] > 50 else 1 / 8.
+            nodes += 1
+            if budget.expired(agentUT):
+                break
+            intervals.add(budget.interval)
+
+        overshoot = agentUT.TIMER_THRESHOLD - clock[0]
+        self.assertGreaterEqual(overshoot, 0)
+        self.assertLessEqual(overshoot, budget.overshoot)
+        # the interval holds `overshoot` milliseconds at the measured speed
+        self.assertIn(64, intervals)
+        self.assertIn(8, intervals)
+        self.assertLess(max(intervals), 128)
+        self.assertLess(budget.polls, nodes / 4)
+
+    @timeout(5)
+    def test_time_manager(self):
+        """ Test that the time manager ends the search within the share of
+        the total time allotted to the move """
+        manager = game_agent.TimeManager(total=200.)
+        agentUT = game_agent.CustomPlayer(
+            -1, game_agent.custom_score, True, 'alphabeta',
+            time_manager=manager)
+        board = isolation.Board(agentUT, "null_agent")
+        for move in [(2, 3), (4, 4), (0, 2), (3, 2)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+
+        start = curr_time_millis()
+        time_left = lambda: 1e4 - (curr_time_millis() - start)
+        move = agentUT.get_move(board, legal_moves, time_left)
+
+        self.assertIn(move, legal_moves)
+        self.assertLess(curr_time_millis() - start, 1e3)
+        self.assertGreater(len(manager.times), 0)
+        self.assertLess(manager.remaining, 200.)
+
+        # the midgame is weighted over the opening for the same time per move
+        opening = manager.allot(board) * len(board.get_blank_spaces())
+        for _ in range(20):
+            board.apply_move(board.get_legal_moves()[0])
+        midgame = manager.allot(board) * len(board.get_blank_spaces())
+        self.assertGreater(midgame, opening)
+
+    @timeout(5)
+    def test_solve_partition(self):
+        """ Test that solving separated positions exactly agrees with the
+        search to the end of the game """
+        board = isolation.Board("Player1", "Player2", 5, 5)
+        board.apply_move((0, 0))
+        board.apply_move((4, 4))
+        self.assertIsNone(game_agent.find_partition(board))
+
+        solved = 0
+        for seed in range(40):
+            rng = random.Random(seed)
+            agentUT = game_agent.CustomPlayer(25, game_agent.custom_score,
+                                              False, 'alphabeta')
+            agentUT.time_left = lambda: 1e6
+            board = isolation.Board(agentUT, "null_agent", 5, 5)
+            while board.get_legal_moves():
+                board.apply_move(rng.choice(board.get_legal_moves()))
+                if board.active_player == agentUT and board.get_legal_moves() \
+                        and game_agent.find_partition(board):
+                    break
+            else:
+                continue
+
+            score, _ = agentUT.alphabeta(board, 25)
+            agentUT.solve_partitions = True
+            solved_score, move = agentUT.alphabeta(board, 25)
+            self.assertEqual(score, solved_score)
+            self.assertIn(move, board.get_legal_moves())
+            # solves are memoized
+            self.assertIn(board.hash_key, agentUT.partitions)
+            solved += 1
+        self.assertGreater(solved, 0)
+
+        # the budget is polled once every 256 states of a solve
+        rng = random.Random(4)
+        board = isolation.Board("Player1", "Player2")
+        while not (board.move_count > 2 and game_agent.find_partition(board)):
+            board.apply_move(rng.choice(board.get_legal_moves()))
+        polls = Counter()
+
+        def expired():
+            polls['polls'] += 1
+            return False
+
+        self.assertEqual(game_agent.solve_partition(board, expired=expired),
+                         game_agent.solve_partition(board))
+        # the number of states is the smallest node limit the solve fits in
+        states = bisect.bisect_left(
+            range(20000), True,
+            key=lambda limit: game_agent.solve_partition(board, limit) is not None)
+        self.assertGreater(polls['polls'], 0)
+        self.assertEqual(polls['polls'], states // 256)
+        with self.assertRaises(game_agent.Timeout):
+            game_agent.solve_partition(board, expired=lambda: True)
+
+    @timeout(5)
+    def test_opening_book(self):
+        """ Test that book moves are played without searching """
+        builder = game_agent.CustomPlayer(2, game_agent.custom_score, False,
+                                          'alphabeta')
+        entries = opening_book.build_book(builder, 3, 5, 5)
+        self.assertGreater(len(entries), 0)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "book.bin")
+            game_agent.OpeningBook.write(path, 5, 5, entries)
+
+            evaluations = Counter()
+
+            def eval_fn(game, player):
+                evaluations['nodes'] += 1
+                return game_agent.custom_score(game, player)
+
+            agentUT = game_agent.CustomPlayer(2, eval_fn, False, 'alphabeta',
+                                              book=path)
+            self.assertIsNone(agentUT.book.keys)
+            board = isolation.Board("null_agent", agentUT, 5, 5)
+            board.apply_move((0, 0))
+            legal_moves = board.get_legal_moves()
+            move = agentUT.get_move(board, legal_moves, lambda: 1e3)
+
+        key, symmetry = board.canonical_key()
+        self.assertEqual(move, symmetry.invert(entries[key]))
+        self.assertEqual(evaluations['nodes'], 0)
+
+    @timeout(30)
+    def test_parallel_round(self):
+        """ Test that a seeded round played in parallel tallies the same
+        results as the serial round, and that the pool of a tournament has at
+        most one process per CPU """
+        agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")] + \
+            [tournament.Agent(game_agent.CustomPlayer(
+                score_fn=score_fn, method='alphabeta',
+                budget=game_agent.NodeBudget(200)), name)
+             for name, score_fn in (("ID_Improved", sample_players.improved_score),
+                                    ("Student", game_agent.custom_score))]
+        results = []
+        pool = multiprocessing.Pool(2)
+        try:
+            for match_pool in (None, pool):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    win_ratio = tournament.play_round(agents, 2, match_pool, seed=0,
+                                                      time_limit=float("inf"))
+                results.append((win_ratio, output.getvalue()))
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(results[0], results[1])
+
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+            else os.cpu_count()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            pool = tournament.make_pool(cpus + 1)
+        self.assertEqual(len(caught), 1)
+        if pool is None:
+            self.assertEqual(cpus, 1)
+        else:
+            self.assertEqual(len(pool._pool), cpus)
+            pool.terminate()
+            pool.join()
+
+    @timeout(30)
+    def test_tuner(self):
+        """ Test that the weighted score reproduces the hardcoded weights, and
+        that tuning resumes from its checkpoint and saves loadable weights """
+        rng = random.Random(0)
+        board = isolation.Board("player1", "player2")
+        for _ in range(8):
+            board.apply_move(rng.choice(board.get_legal_moves()))
+        for player in ("player1", "player2"):
+            self.assertEqual(game_agent.WeightedScore()(board, player),
+                             game_agent.scoring_function_lecture(board, player))
+            self.assertEqual(game_agent.WeightedScore(1., 0., 0.2)(board, player),
+                             game_agent.scoring_function_adaptive(board, player))
+
+        weights = game_agent.WeightedScore().weights
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint = os.path.join(tmpdir, "checkpoint.jsonl")
+            first = tuner.tune(weights, 2, checkpoint, matches=1, nodes=100, seed=0)
+            self.assertEqual(len(tuner.read_checkpoint(checkpoint)), 2)
+            self.assertEqual(tuner.tune(weights, 2, checkpoint), first)
+
+            tuned = tuner.tune(weights, 3, checkpoint, matches=1, nodes=100, seed=0)
+            records = tuner.read_checkpoint(checkpoint)
+            self.assertEqual([record['iteration'] for record in records], [0, 1, 2])
+            self.assertEqual(records[-1]['weights'], tuned)
+            # the resumed run keeps the gain sequences of the checkpoint
+            self.assertEqual([record['gains'] for record in records],
+                             [{'step': 0.05, 'perturbation': 0.2, 'stability': 0.2}] * 3)
+
+            path = os.path.join(tmpdir, "weights.json")
+            game_agent.WeightedScore(**tuned).save(path)
+            score_fn = game_agent.WeightedScore.load(path)
+        self.assertEqual(score_fn.weights, tuned)
+        self.assertEqual(score_fn(board, "player1"),
+                         game_agent.WeightedScore(**tuned)(board, "player1"))
+
+    @timeout(30)
+    def test_parallel_search(self):
+        """ Test that the parallel root search matches the serial search """
+        for method in ("minimax", "alphabeta", "pvs"):
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score,
+                                              False, method, processes=2)
+            agentUT.time_left = lambda: 1e4
+            board = isolation.BitBoard(agentUT, "null_agent")
+            board.apply_move((2, 3))
+            board.apply_move((0, 0))
+            try:
+                self.assertEqual(agentUT.parallel_search(board, 3),
+                                 getattr(agentUT, method)(board, 3))
+                legal_moves = board.get_legal_moves()
+                move = agentUT.get_move(board, legal_moves, lambda: 1e4)
+                self.assertIn(move, legal_moves)
+            finally:
+                agentUT.close()
+
+        # Even if the shared bound already holds the best score when a root
+        # move is searched, as if the workers finished out of order, the
+        # moves that tie with it get exact scores and the serial move wins.
+        score, move = agentUT.alphabeta(board, 3)
+        game_agent._init_worker(multiprocessing.Array('d', [1, score]), None, None)
+        agentUT.method = "alphabeta"
+        results = [game_agent._search_root_move(agentUT, board, root_move, 3,
+                                                float("inf"), 1)
+                   for root_move in board.get_legal_moves()]
+        ties = [root_move for root_move, child_score, alpha in results
+                if child_score > alpha and child_score == score]
+        self.assertGreater(len(ties), 1)
+        self.assertEqual(ties[0], move)
+
+    @timeout(30)
+    def test_lazy_smp(self):
+        """ Test the shared transposition table and Lazy SMP search """
+        table = game_agent.SharedTranspositionTable(64)
+        try:
+            table.store(1234, 3, -2.5, table.LOWER, (2, 3))
+            self.assertEqual(table.probe(1234), (1234, 3, -2.5, table.LOWER, (2, 3)))
+            self.assertIsNone(table.probe(1234 + 64))
+            table.store(1234 + 64, 1, 0., table.EXACT, (-1, -1))
+            self.assertIsNone(table.probe(1234 + 64))
+        finally:
+            table.close()
+
+        agentUT = game_agent.CustomPlayer(
+            score_fn=game_agent.custom_score, method="alphabeta",
+            processes=2, parallel="lazy", tt_size=4096)
+        board = isolation.BitBoard(agentUT, "null_agent")
+        board.apply_move((2, 3))
+        board.apply_move((0, 0))
+        legal_moves = board.get_legal_moves()
+        try:
+            timer = curr_time_millis()
+            move = agentUT.get_move(board, legal_moves,
+                                    lambda: 200 - (curr_time_millis() - timer))
+            self.assertIn(move, legal_moves)
+            self.assertIsInstance(agentUT.tt, game_agent.SharedTranspositionTable)
+            # the helpers are stopped as soon as the move is returned
+            self.assertEqual(agentUT.helpers.value, -1)
+        finally:
+            agentUT.close()
+
+        # A helper of a search that was stopped returns at its first node,
+        # even though the move is not due yet.
+        game_agent._init_worker(None, None, multiprocessing.RawValue('i', -1))
+        board = CounterBoard(agentUT, "null_agent")
+        board.apply_move((2, 3))
+        board.apply_move((0, 0))
+        game_agent._lazy_smp_helper(agentUT, board, float("inf"), 0, 1)
+        self.assertEqual(board.counts, (0, 0))
+
+    @timeout(10)
+    def test_pondering(self):
+        """ Test that pondering searches the replies of the opponent and that
+        Board.play notifies players of the moves they receive """
+        agentUT = game_agent.CustomPlayer(
+            score_fn=game_agent.custom_score, method="alphabeta",
+            ponder=100., tt_size=4096)
+        board = isolation.BitBoard(agentUT, "null_agent")
+        board.apply_move((2, 3))
+        board.apply_move((0, 0))
+        legal_moves = board.get_legal_moves()
+        try:
+            timer = curr_time_millis()
+            time_left = lambda: 100 - (curr_time_millis() - timer)
+            move = agentUT.get_move(board, legal_moves, time_left)
+            # the worker pool is started within the time of the first move
+            self.assertGreater(time_left(), 0)
+            time.sleep(0.3)
+            board.apply_move(move)
+            for reply in board.get_legal_moves():
+                child = board.forecast_move(reply)
+                self.assertIsNotNone(agentUT.tt.probe((child.hash_key << 1) | 1))
+        finally:
+            agentUT.close()
+
+        class Listener(sample_players.RandomPlayer):
+            def __init__(self):
+                self.received = []
+
+            def move_received(self, move):
+                self.received.append(move)
+
+        listener = Listener()
+        opponent = sample_players.RandomPlayer()
+        _, history, _ = isolation.Board(listener, opponent, 5, 5).play()
+        # the final move of the game is not legal, and thus never applied
+        self.assertEqual(listener.received,
+                         [moves[1] for moves in history
+                          if len(moves) > 1 and moves[1] != (-1, -1)])
+
+    @timeout(10)
+    def test_mcts(self):
+        """ Test that Monte Carlo tree search returns a legal move within its
+        budget, plays a move that wins at once, and that rollouts end the game """
+        agentUT = game_agent.CustomPlayer(method='mcts',
+                                          budget=game_agent.NodeBudget(500))
+        board = isolation.Board(agentUT, "null_agent")
+        for move in [(2, 3), (4, 4), (0, 2), (3, 2)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+        self.assertIn(agentUT.get_move(board, legal_moves, lambda: float("inf")),
+                      legal_moves)
+        self.assertEqual(agentUT.rollouts, 500)
+        self.assertGreater(agentUT.rollouts_per_second, 0)
+
+        # play random games until the agent can end the game with one move
+        rng = random.Random(0)
+        wins = 0
+        while wins < 3:
+            board = isolation.Board(agentUT, "null_agent", 5, 5)
+            while board.get_legal_moves():
+                legal_moves = board.get_legal_moves()
+                winning = [move for move in legal_moves
+                           if not board.forecast_move(move).get_legal_moves()]
+                if winning and len(winning) < len(legal_moves) and \
+                        board.active_player == agentUT and board.move_count > 1:
+                    agentUT.budget = game_agent.NodeBudget(2000)
+                    move = agentUT.get_move(board, legal_moves, lambda: float("inf"))
+                    self.assertIn(move, winning)
+                    wins += 1
+                    break
+                board.apply_move(rng.choice(legal_moves))
+
+        # the player to move loses when it is blocked, after any policy
+        targets = isolation.isolation.move_table(5, 5).targets
+        for policy in isolation.rollout.POLICIES:
+            blocked = sum(bit for bit, _ in targets[0]) | 1 | (1 << 24)
+            self.assertFalse(isolation.rollout.rollout(targets, blocked, 0, 24, policy))
+            self.assertTrue(isolation.rollout.rollout(targets, blocked, 24, 0, policy))
+
 
     @timeout(10)
     # @unittest.skip("Skip iterative deepening test.")  # Uncomment this line to skip test
@@ -535,6 +1055,300 @@ class Project1Test(unittest.TestCase):
             self.assertTrue(chosen_move in legal_moves, INVALID_MOVE.format(
                 legal_moves, chosen_move))
 
+    @timeout(10)
+    def test_transposition_table(self):
+        """ Test that the transposition table does not change search results """
+        for method, depth in (("minimax", 4), ("alphabeta", 6)):
+            self.assertVariantsAgree(
+                "tt_size", (None, 4096),
+                lambda agentUT, board: getattr(agentUT, method)(board, depth),
+                plies=8, search_depth=depth, iterative=False, method=method,
+                inplace=True)
+
+    @timeout(10)
+    def test_move_ordering(self):
+        """ Test that move ordering keeps the alphabeta scores unchanged """
+        # search at increasing depths as iterative deepening does
+        self.assertVariantsAgree(
+            "ordering", (False, True),
+            lambda agentUT, board: [agentUT.alphabeta(board, depth)[0]
+                                    for depth in range(1, 7)],
+            search_depth=6, iterative=False, method="alphabeta", inplace=True)
+
+    @timeout(10)
+    def test_eval_cache(self):
+        """ Test that the evaluation cache keeps the alphabeta scores
+        unchanged and stays within its size """
+        caches = []
+
+        def search(agentUT, board):
+            # the leaves of the next move were already evaluated by this one
+            score, move = agentUT.alphabeta(board, 5)
+            board.apply_move(move)
+            board.apply_move(board.get_legal_moves()[0])
+            caches.append(agentUT.score)
+            return [score, agentUT.alphabeta(board, 3)[0]]
+
+        self.assertVariantsAgree("eval_cache", (None, 1000), search, seeds=[0],
+                                 search_depth=5, iterative=False,
+                                 method="alphabeta", inplace=True)
+        self.assertGreater(caches[-1].hits, 0)
+
+        # the least recently used entry is evicted
+        agentUT = game_agent.CustomPlayer()
+        cache = game_agent.EvalCache(game_agent.custom_score, 2)
+        board = isolation.BitBoard(agentUT, "null_agent")
+        board.apply_move((3, 3))
+        boards = [board.forecast_move(move) for move in board.get_legal_moves()[:3]]
+        for game in boards[:2] + boards[:1] + boards[2:] + boards[:1] + boards[1:2]:
+            cache(game, agentUT)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache.entries), 2)
+
+        # worker processes receive an empty cache
+        copied = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(copied.entries), copied.size), (0, cache.size))
+
+        # the batch version of the score function is passed on
+        self.assertIs(game_agent.EvalCache(game_agent.custom_score).batch,
+                      game_agent.custom_score.batch)
+
+    @unittest.skipUnless(isolation.batch.AVAILABLE, "NumPy is not installed")
+    @timeout(10)
+    def test_batch_evaluation(self):
+        """ Test that evaluating leaves in batches keeps the alphabeta scores
+        and moves unchanged """
+        for board_class in (isolation.Board, isolation.BitBoard):
+            for score_fn in (game_agent.custom_score, sample_players.improved_score):
+                for seed in range(3):
+                    self.assertVariantsAgree(
+                        "batch", (False, True),
+                        lambda agentUT, board: [agentUT.alphabeta(board, depth)
+                                                for depth in range(1, 5)],
+                        seeds=[seed], plies=6 + seed, board_class=board_class,
+                        search_depth=4, score_fn=score_fn, iterative=False,
+                        method="alphabeta")
+
+    @timeout(10)
+    def test_keep_tables(self):
+        """ Test that the search tables are aged across the moves of a game
+        and cleared for a new game """
+        agentUT = game_agent.CustomPlayer(
+            4, game_agent.custom_score, False, "alphabeta", inplace=True,
+            tt_size=4096, ordering=True, keep_tables=True)
+        board = isolation.BitBoard(agentUT, "null_agent")
+        board.apply_move((3, 3))
+        board.apply_move((2, 1))
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        stored = sum(entry is not None for entry in agentUT.tt.entries)
+        history = dict(agentUT.history)
+        self.assertGreater(stored, 0)
+
+        board.apply_move(move)
+        board.apply_move(board.get_legal_moves()[0])
+        agentUT.age_tables(board)
+        self.assertEqual(sum(entry is not None for entry in agentUT.tt.entries), stored)
+        self.assertEqual(agentUT.tt.age, 1)
+        self.assertEqual(dict(agentUT.history),
+                         {move: score // 2 for move, score in history.items() if score > 1})
+        self.assertTrue(all(ply >= board.move_count for ply in agentUT.killers))
+        self.assertTrue(agentUT.pv_table)
+        self.assertTrue(all(ply >= board.move_count for ply in agentUT.pv_table))
+
+        board = isolation.BitBoard(agentUT, "null_agent")
+        board.apply_move((3, 3))
+        board.apply_move((2, 1))
+        agentUT.age_tables(board)
+        self.assertFalse(any(agentUT.tt.entries))
+        self.assertFalse(agentUT.history)
+        self.assertFalse(agentUT.pv_table)
+
+
+class BitBoardTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_matches_board(self):
+        """ Test that BitBoard reports the same game states as Board """
+        rng = random.Random(0)
+        for w, h in [(7, 7), (5, 8), (9, 4)]:
+            for _ in range(10):
+                board = isolation.Board("p1", "p2", w, h)
+                bitboard = isolation.BitBoard("p1", "p2", w, h)
+                while True:
+                    for player in ("p1", "p2"):
+                        self.assertEqual(board.get_legal_moves(player),
+                                         bitboard.get_legal_moves(player))
+                        self.assertEqual(board.get_player_location(player),
+                                         bitboard.get_player_location(player))
+                        self.assertEqual(board.utility(player),
+                                         bitboard.utility(player))
+                    self.assertEqual(board.get_blank_spaces(),
+                                     bitboard.get_blank_spaces())
+                    moves = board.get_legal_moves()
+                    if not moves:
+                        break
+                    move = rng.choice(moves)
+                    bitboard = bitboard.forecast_move(move)
+                    board.apply_move(move)
+                self.assertEqual(board.print_board(), bitboard.print_board())
+                self.assertEqual(board.move_count, bitboard.move_count)
+
+    @timeout(5)
+    def test_search_matches_board(self):
+        """ Test that CustomPlayer searches a BitBoard like a Board """
+        agentUT = game_agent.CustomPlayer(4, game_agent.custom_score, False,
+                                          "alphabeta")
+        agentUT.time_left = lambda: 1e3
+        results = []
+        for board_class in (isolation.Board, isolation.BitBoard):
+            board = board_class(agentUT, "null_agent")
+            board.apply_move((2, 3))
+            board.apply_move((0, 0))
+            results.append(agentUT.alphabeta(board, 4))
+        self.assertEqual(results[0], results[1])
+
+    @timeout(5)
+    def test_undo_move(self):
+        """ Test that undo_move restores the state before apply_move """
+        for board_class in (isolation.Board, isolation.BitBoard):
+            board = board_class("p1", "p2")
+            board.apply_move((2, 3))
+            board.apply_move((0, 0))
+            before = board.print_board()
+            for move in board.get_legal_moves():
+                board.apply_move(move)
+                for reply in board.get_legal_moves():
+                    board.apply_move(reply)
+                    self.assertEqual(board.undo_move(), reply)
+                self.assertEqual(board.undo_move(), move)
+                self.assertEqual(board.print_board(), before)
+                self.assertEqual(board.active_player, "p1")
+                self.assertEqual(board.move_count, 2)
+
+    @timeout(5)
+    def test_inplace_search(self):
+        """ Test that in-place search matches search on board copies """
+        for method in ("minimax", "alphabeta"):
+            results = []
+            for inplace in (False, True):
+                agentUT = game_agent.CustomPlayer(
+                    3, game_agent.custom_score, False, method, inplace=inplace)
+                agentUT.time_left = lambda: 1e3
+                board = isolation.BitBoard(agentUT, "null_agent")
+                board.apply_move((2, 3))
+                board.apply_move((0, 0))
+                before = board.print_board()
+                results.append(getattr(agentUT, method)(board, 3))
+                self.assertEqual(board.print_board(), before)
+            self.assertEqual(results[0], results[1])
+
+    @timeout(5)
+    def test_hash_key(self):
+        """ Test that both boards maintain the same incremental hash """
+        rng = random.Random(1)
+        board = isolation.Board("p1", "p2")
+        bitboard = isolation.BitBoard("p1", "p2")
+        keys = [board.hash_key]
+        while board.get_legal_moves():
+            move = rng.choice(board.get_legal_moves())
+            board.apply_move(move)
+            bitboard.apply_move(move)
+            self.assertEqual(board.hash_key, bitboard.hash_key)
+            self.assertNotIn(board.hash_key, keys)
+            keys.append(board.hash_key)
+        while board.move_count:
+            board.undo_move()
+            bitboard.undo_move()
+            self.assertEqual(board.hash_key, keys[board.move_count])
+            self.assertEqual(bitboard.hash_key, keys[board.move_count])
+
+        # A subclass whose copy() does not carry the history and the hash
+        # over gets them restored, and can undo the moves after the copy.
+        board = CounterBoard("p1", "p2")
+        for move in [(2, 3), (4, 4), (0, 2)]:
+            board.apply_move(move)
+        move = board.get_legal_moves()[0]
+        child = board.forecast_move(move)
+        reference = isolation.Board("p1", "p2")
+        for move in [(2, 3), (4, 4), (0, 2), move]:
+            reference.apply_move(move)
+        self.assertEqual(child.hash_key, reference.hash_key)
+        child.undo_move()
+        self.assertEqual(child.hash_key, board.hash_key)
+        self.assertRaises(RuntimeError, child.undo_move)
+
+    @timeout(5)
+    def test_canonical_key(self):
+        """ Test that symmetric game states share their canonical key """
+        for board_class in (isolation.Board, isolation.BitBoard):
+            for width, height, count in ((7, 7, 8), (5, 6, 4)):
+                rng = random.Random(width)
+                board = board_class("p1", "p2", width, height)
+                for _ in range(8):
+                    board.apply_move(rng.choice(board.get_legal_moves()))
+                key, symmetry = board.canonical_key()
+                canonical, _ = board.canonical_form()
+                self.assertEqual(canonical.hash_key, key)
+
+                symmetries = isolation.isolation.symmetries(width, height)
+                self.assertEqual(len(symmetries), count)
+                for symmetry in symmetries:
+                    image = board.transform(symmetry)
+                    self.assertEqual(image.canonical_key()[0], key)
+                    self.assertEqual(
+                        sorted(image.get_legal_moves()),
+                        sorted(symmetry.apply(move) for move in board.get_legal_moves()))
+                    for move in board.get_blank_spaces():
+                        self.assertEqual(symmetry.invert(symmetry.apply(move)), move)
+
+                    # the history is mapped too
+                    image.undo_move()
+                    previous = board.copy()
+                    previous.undo_move()
+                    self.assertEqual(image.hash_key, previous.transform(symmetry).hash_key)
+
+
+class SimulatorTest(unittest.TestCase):
+
+    @unittest.skipUnless(isolation.batch.AVAILABLE, "NumPy is not installed")
+    def test_simulator(self):
+        """ Test that the vectorized simulator plays like GreedyPlayer and
+        only plays legal moves with the random policy """
+        import numpy as np
+        from isolation.simulator import GameBatch
+
+        rng = random.Random(0)
+        openings = []
+        for _ in range(20):
+            board = isolation.Board(1, 2, 5, 5)
+            for _ in range(2):
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            openings.append(board.get_player_location(1) + board.get_player_location(2))
+
+        for policies in (('greedy', 'greedy'), ('random', 'greedy')):
+            games = GameBatch(len(openings), 5, 5)
+            for row, col in ((0, 1), (2, 3)):
+                games.apply_moves(np.array([o[col] * 5 + o[row] for o in openings]))
+            winners = games.play(policies, np.random.default_rng(0))
+
+            for idx, opening in enumerate(openings):
+                moves = games.moves(idx)
+                player1, player2 = sample_players.GreedyPlayer(), sample_players.GreedyPlayer()
+                board = isolation.Board(player1, player2, 5, 5)
+                if policies[0] == 'greedy':
+                    board.apply_move(opening[:2])
+                    board.apply_move(opening[2:])
+                    winner, history, _ = board.play(time_limit=float("inf"))
+                    played = [move for pair in history for move in pair]
+                    # the final move of the game is not legal, i.e. (-1, -1)
+                    self.assertEqual(moves, [opening[:2], opening[2:]] + played[:-1])
+                    self.assertEqual(winner, (player1, player2)[winners[idx]])
+                else:
+                    for move in moves:
+                        self.assertIn(move, board.get_legal_moves())
+                        board.apply_move(move)
+                    self.assertFalse(board.get_legal_moves())
+                    self.assertEqual(winners[idx], 1 - board.move_count % 2)
 
 
 if __name__ == '__main__':
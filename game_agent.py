@@ -7,7 +7,23 @@ You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
 
+import bisect
+import json
+import math
+import multiprocessing
 import random
+import struct
+import timeit
+
+from collections import Counter
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from isolation.batch import PositionBatch
+from isolation.isolation import blocked_mask
+from isolation.isolation import move_table
+from isolation.rollout import bitmask_state
+from isolation.rollout import rollout
 
 # ------------------------------------------------------------------------------
 
@@ -41,8 +57,8 @@ def custom_score(game, player):
     """
 
     # This function acts as a dispatch mechanism so that different methods can
-    # easily be tested against each other.
-    return scoring_function_lecture(game, player)
+    # easily be tested against each other (see `CUSTOM_SCORE`).
+    return CUSTOM_SCORE(game, player)
 
 # ------------------------------------------------------------------------------
 
@@ -94,6 +110,19 @@ def scoring_function_lecture(game, player):
 
 # ------------------------------------------------------------------------------
 
+def scoring_function_lecture_batch(positions):
+    """ This function evaluates `scoring_function_lecture` on every state of
+    an `isolation.batch.PositionBatch` at once."""
+
+    ownMoves, opponentMoves = positions.mobility()
+
+    return 1.3 * ownMoves - 1.75 * opponentMoves
+
+
+scoring_function_lecture.batch = scoring_function_lecture_batch
+
+# ------------------------------------------------------------------------------
+
 def scoring_function_strategy(game, player):
 
     # If we are in the beginning of the game, ...
@@ -109,37 +138,945 @@ def scoring_function_strategy(game, player):
 
 # ------------------------------------------------------------------------------
 
-def scoring_function_longest_path(game, player):
+def scoring_function_longest_path(game, player, node_limit=2000):
 
     """This scoring function should prefer moves that have a longer path for
     the player than for the opponent. It should only be used in endgame as the
-    performance impact is significant!"""
+    performance impact is significant!
+
+    The paths are searched depth first on bitmasks of the blocked cells, and
+    the score of every visited state is memoized, so a state reached along
+    different paths is only evaluated once. If more than `node_limit` states
+    would have to be evaluated, or a player has not been placed on the board
+    yet, the much cheaper difference in mobility is returned instead."""
+
+    own_location = game.get_player_location(player)
+    nme_location = game.get_player_location(game.get_opponent(player))
+    if own_location is None or nme_location is None:
+        return _mobility_difference(game, player)
+
+    height = game.height
+    steps = move_table(game.width, height).steps
+    blocked = blocked_mask(game)
+
+    own_idx = own_location[1] * height + own_location[0]
+    nme_idx = nme_location[1] * height + nme_location[0]
+    if game.active_player == player:
+        active, inactive, player_active = own_idx, nme_idx, True
+    else:
+        active, inactive, player_active = nme_idx, own_idx, False
+
+    memo = {}
+
+    def longest_path(blocked, active, inactive, player_active):
+        # The score of the player at `active` (if player_active) or at
+        # `inactive`, computed exactly like the recursion through
+        # `forecast_move()`: every move, including a move of the inactive
+        # player, relocates the active player and passes the initiative.
+        key = (blocked, active, inactive, player_active)
+        score = memo.get(key)
+        if score is not None:
+            return score
+        if len(memo) >= node_limit:
+            raise _NodeLimit()
+
+        if player_active:
+            own, nme = active, inactive
+        else:
+            own, nme = inactive, active
+
+        own_longest_path = 0
+        nme_longest_path = 0
+        own_moves = [bit for bit, _ in steps[own] if not blocked & bit]
+
+        if own_moves:
+            for bit in own_moves:
+                score = longest_path(blocked | bit, inactive, bit.bit_length() - 1,
+                                     not player_active) + 1
+                if score > own_longest_path:
+                    own_longest_path = score
+
+            for bit, _ in steps[nme]:
+                if blocked & bit:
+                    continue
+                score = longest_path(blocked | bit, inactive, bit.bit_length() - 1,
+                                     player_active) + 1
+                if score > nme_longest_path:
+                    nme_longest_path = score
+
+        memo[key] = own_longest_path - nme_longest_path
+        return memo[key]
+
+    try:
+        return float(longest_path(blocked, active, inactive, player_active))
+    except _NodeLimit:
+        return _mobility_difference(game, player)
 
-    own_longest_path = 0
-    nme_longest_path = 0
+# ------------------------------------------------------------------------------
 
-    if not game.get_legal_moves(player):
-        return 0
+class _NodeLimit(Exception):
+    """Raised when the longest path evaluation exceeds its node limit."""
+    pass
 
-    for move in game.get_legal_moves(player):
+# ------------------------------------------------------------------------------
 
-        gamestate = game.forecast_move(move)
+def _mobility_difference(game, player):
+    """ This function returns the difference between the number of legal
+    moves of the player and of its opponent."""
+    return float(len(game.get_legal_moves(player)) -
+                 len(game.get_legal_moves(game.get_opponent(player))))
+
+# ------------------------------------------------------------------------------
+
+def find_partition(game):
+    """ This function detects whether the players are separated, i.e. no cell
+    that one player can still reach is reachable by the other player. The
+    game then splits into two independent longest path problems.
+
+    The regions are found by a flood fill along knight moves over the blank
+    cells, starting from the location of each player.
+
+    Returns
+    ----------
+    (int, int) or None
+        The bitmasks of the cells reachable by the active and the inactive
+        player, or None if the players are not separated (or not placed)."""
+
+    masks = move_table(game.width, game.height).masks
+    free = ~blocked_mask(game)
+
+    starts = []
+    for player in (game.active_player, game.inactive_player):
+        location = game.get_player_location(player)
+        if location is None:
+            return None
+        starts.append(masks[location[1] * game.height + location[0]] & free)
+
+    # The regions overlap if and only if the region of the active player
+    # reaches a cell next to the inactive player, so the first flood fill
+    # stops as soon as it does, which is the common case.
+    regions = []
+    for start, stop in ((starts[0], starts[1]), (starts[1], 0)):
+        region = 0
+        frontier = start
+        while frontier:
+            if frontier & stop:
+                return None
+            region |= frontier
+            reached = 0
+            while frontier:
+                bit = frontier & -frontier
+                frontier ^= bit
+                reached |= masks[bit.bit_length() - 1]
+            frontier = reached & free & ~region
+        regions.append(region)
+
+    return regions[0], regions[1]
+
+# ------------------------------------------------------------------------------
+
+# The number of longest path states between two checks of the search budget
+# in `solve_partition()`.
+_PARTITION_POLL = 256
+
+def solve_partition(game, node_limit=20000, expired=None):
+    """ This function solves a game in which the players are separated (see
+    `find_partition()`). Each player can then make as many moves as the
+    longest path in its region, and the active player wins if and only if
+    its longest path is strictly longer than the one of the inactive player.
+
+    If `expired` is given, it is called every `_PARTITION_POLL` states of the
+    longest path search, which is aborted with a `Timeout` once it returns
+    True, e.g. when the search budget of the agent runs out.
+
+    Returns
+    ----------
+    (int, int, (int, int)) or None
+        The lengths of the longest paths of the active and of the inactive
+        player, and the first move along the path of the active player; or
+        None if the players are not separated or a longest path search
+        exceeds `node_limit` states."""
+
+    regions = find_partition(game)
+    if regions is None:
+        return None
+
+    height = game.height
+    steps = move_table(game.width, height).steps
+    memo = {}
+    visited = 0
+
+    def longest_path(idx, free):
+        nonlocal visited
+        key = (idx, free)
+        length = memo.get(key)
+        if length is not None:
+            return length
+        if len(memo) >= node_limit:
+            raise _NodeLimit()
+        visited += 1
+        if expired is not None and visited % _PARTITION_POLL == 0 and expired():
+            raise Timeout()
+        length = 0
+        for bit, _ in steps[idx]:
+            if free & bit:
+                length = max(length, longest_path(bit.bit_length() - 1, free ^ bit) + 1)
+        memo[key] = length
+        return length
+
+    lengths = []
+    best_move = None
+    try:
+        for player, region in zip((game.active_player, game.inactive_player), regions):
+            r, c = game.get_player_location(player)
+            idx = c * height + r
+            if not lengths:
+                # The first move along the longest path of the active player.
+                length = 0
+                for bit, move in steps[idx]:
+                    if region & bit:
+                        path = longest_path(bit.bit_length() - 1, region ^ bit) + 1
+                        if path > length:
+                            length, best_move = path, move
+            else:
+                length = longest_path(idx, region)
+            lengths.append(length)
+    except _NodeLimit:
+        return None
+
+    return lengths[0], lengths[1], best_move
+
+# ------------------------------------------------------------------------------
+
+
+class WeightedScore:
+    """Score function with tunable weights, which generalizes both
+    `scoring_function_lecture` and `scoring_function_adaptive`:
+
+        own * own_moves - (opponent + scaling * cells / move_count) * opponent_moves
+
+    The defaults reproduce `scoring_function_lecture`; `WeightedScore(1., 0.,
+    0.2)` reproduces `scoring_function_adaptive`. Instances are picklable, so
+    they can be sent to worker processes, and are saved as and loaded from
+    JSON files of their weights (see tuner.py).
+
+    Parameters
+    ----------
+    own : float (optional)
+        The weight of the number of moves of the player.
+
+    opponent : float (optional)
+        The weight of the number of moves of the opponent.
+
+    scaling : float (optional)
+        The weight of the number of moves of the opponent that decays with
+        the number of moves played, relative to the number of cells.
+    """
+
+    PARAMETERS = ('own', 'opponent', 'scaling')
+
+    def __init__(self, own=1.3, opponent=1.75, scaling=0.):
+        self.own = own
+        self.opponent = opponent
+        self.scaling = scaling
+
+    def __call__(self, game, player):
+        ownMoves = game.get_legal_moves(player).__len__()
+        opponentMoves = game.get_legal_moves(game.get_opponent(player)).__len__()
+
+        opponentWeight = self.opponent
+        if self.scaling:
+            opponentWeight += self.scaling * (game.height * game.width) / game.move_count
+
+        return float(self.own * ownMoves - opponentWeight * opponentMoves)
+
+    def __repr__(self):
+        return "WeightedScore(own={!r}, opponent={!r}, scaling={!r})".format(
+            self.own, self.opponent, self.scaling)
+
+    @property
+    def weights(self):
+        """The weights as a dict keyed by parameter name."""
+        return {name: getattr(self, name) for name in self.PARAMETERS}
+
+    def save(self, path):
+        """Write the weights to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.weights, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Read a score function from a JSON file written by `save()`."""
+        with open(path) as f:
+            return cls(**json.load(f))
+
+# ------------------------------------------------------------------------------
+
+# The heuristic `custom_score` dispatches to. Its batch version, if it has one,
+# evaluates batches of leaves for `custom_score`, so that both always agree.
+CUSTOM_SCORE = scoring_function_lecture
+custom_score.batch = getattr(CUSTOM_SCORE, 'batch', None)
+
+# ------------------------------------------------------------------------------
+
+
+class EvalCache:
+    """Bounded cache of the results of a score function, keyed by the Zobrist
+    hash of the game state (see `isolation.Board.hash_key`) and by whether
+    the evaluated player is the active one. When the cache is full, the least
+    recently used entry is evicted.
+
+    An `EvalCache` is called like the score function it wraps. It must only
+    wrap deterministic score functions, as cached results are returned for
+    every later evaluation of the same state. The `batch` version of the
+    score function, if any, is passed on unchanged, so batch evaluation
+    keeps working but bypasses the cache.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to cache.
+
+    size : int (optional)
+        The maximum number of cached results.
+
+    Attributes
+    ----------
+    hits : int
+        The number of evaluations answered from the cache.
+
+    misses : int
+        The number of evaluations computed by the score function.
+    """
+
+    def __init__(self, score_fn, size=2**16):
+        self.score_fn = score_fn
+        self.batch = getattr(score_fn, 'batch', None)
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, game, player):
+        key = (game.hash_key << 1) | (game.active_player == player)
+        score = self.entries.get(key)
+        if score is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return score
+
+        self.misses += 1
+        score = self.entries[key] = self.score_fn(game, player)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return score
+
+    def clear(self):
+        """Remove all entries from the cache and reset the counters."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Entries are not sent to worker processes, which start with an empty
+        # cache of the same configuration.
+        return self.score_fn, self.size
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+# ------------------------------------------------------------------------------
+
+
+class TranspositionTable:
+    """Bounded table of search results keyed by the Zobrist hash of a game
+    state (see `isolation.Board.hash_key`). Every slot holds one entry of the
+    form (key, depth, value, flag, move), where flag tells whether value is
+    the exact minimax value (EXACT), or a lower (LOWER) or upper (UPPER)
+    bound of it, and remembers the age of the search that stored the entry
+    (see `new_search()`).
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table. A key is stored in the slot
+        `key % size`, so two positions may compete for the same slot.
+
+    replacement : {'depth', 'always'} (optional)
+        The policy applied when a slot is occupied by another position.
+        'depth' keeps the entry searched to the greater depth, unless it was
+        stored by an earlier search; 'always' overwrites it with the most
+        recent result.
+    """
+
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, size=2**16, replacement='depth'):
+        if replacement not in ('depth', 'always'):
+            raise ValueError("Unknown replacement policy: {}".format(replacement))
+        self.size = size
+        self.replacement = replacement
+        self.age = 0
+        self.clear()
+
+    def clear(self):
+        """Remove all entries from the table."""
+        self.entries = [None] * self.size
+        self.ages = [0] * self.size
+
+    def new_search(self):
+        """Start a new search that keeps the entries of earlier searches,
+        but replaces them first when slots compete."""
+        self.age = (self.age + 1) % 256
+
+    def probe(self, key):
+        """Return the entry stored for the key, or None if there is none."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        """Store a search result, subject to the replacement policy."""
+        idx = key % self.size
+        entry = self.entries[idx]
+        if entry is None or entry[0] == key or depth >= entry[1] or \
+                self.ages[idx] != self.age or self.replacement == 'always':
+            self.entries[idx] = (key, depth, value, flag, move)
+            self.ages[idx] = self.age
+
+    def __getstate__(self):
+        # Entries are not sent to worker processes, which start with an empty
+        # table of the same configuration.
+        return self.size, self.replacement
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table stored in a shared memory block, so that several
+    processes can read and write the same entries without locking.
+
+    Every slot holds three 64 bit words: a check word, the bits of the value
+    and a word packing the depth, flag, move and age. The check word is the key
+    XOR the two data words, so an entry that is torn by concurrent writes
+    fails verification and is treated as a miss.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+
+    replacement : {'depth', 'always'} (optional)
+        The policy applied when a slot is occupied by another position.
+
+    name : str (optional)
+        The name of an existing shared memory block to attach to. A new block
+        is created (and owned by this table) if the name is None.
+    """
+
+    KEY_MASK = (1 << 64) - 1
+    VALID = 1 << 34
+    ENTRY = struct.Struct('<QQQ')
+    WORD = struct.Struct('<Q')
+    DOUBLE = struct.Struct('<d')
+
+    def __init__(self, size=2**16, replacement='depth', name=None):
+        if replacement not in ('depth', 'always'):
+            raise ValueError("Unknown replacement policy: {}".format(replacement))
+        self.size = size
+        self.replacement = replacement
+        self.age = 0
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=self.ENTRY.size * size)
+            self.clear()
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+
+    def clear(self):
+        """Remove all entries from the table."""
+        self.memory.buf[:self.ENTRY.size * self.size] = bytes(self.ENTRY.size * self.size)
+
+    def close(self):
+        """Detach from the shared memory block, and release it if this table
+        created it."""
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def probe(self, key):
+        """Return the entry stored for the key, or None if there is none."""
+        key &= self.KEY_MASK
+        check, bits, meta = self.ENTRY.unpack_from(self.memory.buf,
+                                                   self.ENTRY.size * (key % self.size))
+        if not meta or check ^ bits ^ meta != key:
+            return None
+        value = self.DOUBLE.unpack(self.WORD.pack(bits))[0]
+        move = ((meta >> 18) & 0xFF) - 1, ((meta >> 26) & 0xFF) - 1
+        return key, meta & 0xFFFF, value, (meta >> 16) & 3, move
+
+    def store(self, key, depth, value, flag, move):
+        """Store a search result, subject to the replacement policy."""
+        key &= self.KEY_MASK
+        offset = self.ENTRY.size * (key % self.size)
+        if self.replacement == 'depth':
+            check, bits, meta = self.ENTRY.unpack_from(self.memory.buf, offset)
+            if meta and check ^ bits ^ meta != key and depth < meta & 0xFFFF and \
+                    (meta >> 35) & 0xFF == self.age:
+                return
+        bits = self.WORD.unpack(self.DOUBLE.pack(value))[0]
+        meta = self.VALID | depth | flag << 16 | (move[0] + 1) << 18 | \
+            (move[1] + 1) << 26 | self.age << 35
+        self.ENTRY.pack_into(self.memory.buf, offset, key ^ bits ^ meta, bits, meta)
+
+    def __getstate__(self):
+        # Other processes attach to the same shared memory block, and store
+        # entries with the age of the current search.
+        return self.size, self.replacement, self.memory.name, self.age
+
+    def __setstate__(self, state):
+        size, replacement, name, age = state
+        attached = _WORKER_STATE.setdefault('tables', {})
+        if name not in attached:
+            attached[name] = SharedTranspositionTable(size, replacement, name)
+        self.__dict__.update(attached[name].__dict__)
+        self.age = age
+
+# ------------------------------------------------------------------------------
+
+
+class TimeBudget:
+    """Search budget that ends the search when the time left for the move
+    (see `CustomPlayer.time_left`) falls below the `TIMER_THRESHOLD` of the
+    player. This is the default budget of `CustomPlayer`.
+    """
+
+    def start(self):
+        """Reset the budget at the start of a move."""
+        pass
+
+    def expired(self, player):
+        """Return True if the search of the player has to stop."""
+        return player.time_left() < player.TIMER_THRESHOLD
+
+
+class PollingTimeBudget(TimeBudget):
+    """Search budget that ends the search on the same condition as
+    `TimeBudget`, but reads the clock only every `interval` nodes instead of
+    at every node.
+
+    The interval adapts to the measured time per node, such that at most
+    `overshoot` milliseconds pass between two readings of the clock, and
+    shrinks down to a single node as the time left approaches the threshold.
+    The search therefore stops at most `overshoot` milliseconds late, which
+    allows a smaller `TIMER_THRESHOLD` than the cost of a clock reading at
+    every node would.
+
+    Parameters
+    ----------
+    overshoot : float (optional)
+        The maximum number of milliseconds between two readings of the clock.
+
+    max_interval : int (optional)
+        The maximum number of nodes between two readings of the clock.
+    """
+
+    def __init__(self, overshoot=1., max_interval=1024):
+        self.overshoot = overshoot
+        self.max_interval = max_interval
+        self.start()
+
+    def start(self):
+        """Reset the budget at the start of a move."""
+        self.interval = 1
+        self.countdown = 1
+        self.last = None
+        self.polls = 0
+
+    def expired(self, player):
+        """Return True if the search of the player has to stop."""
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+
+        time_left = player.time_left()
+        slack = time_left - player.TIMER_THRESHOLD
+        self.polls += 1
+
+        # Size the next interval from the time the last one took. If the
+        # clock did not advance, the interval was too short to measure.
+        if self.last is not None and time_left < self.last:
+            per_node = (self.last - time_left) / self.interval
+            self.interval = int(min(self.overshoot, slack) / per_node)
+        else:
+            self.interval *= 2
+        self.interval = max(1, min(self.interval, self.max_interval))
+        self.countdown = self.interval
+        self.last = time_left
+
+        return slack < 0
+
+
+class NodeBudget(TimeBudget):
+    """Search budget that ends the search after a fixed number of nodes,
+    independent of the speed and load of the machine. The search of a move
+    then only depends on the game state, which makes matches between agents
+    reproducible.
+
+    The time limit is still enforced as a safeguard, so a node budget should
+    be combined with a generous (or infinite) time limit per move. Every
+    worker process of a parallel search counts its own nodes.
+
+    Parameters
+    ----------
+    nodes : int
+        The number of nodes the search may visit for every move.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.searched = 0
+
+    def start(self):
+        """Reset the budget at the start of a move."""
+        self.searched = 0
+
+    def expired(self, player):
+        """Return True if the search of the player has to stop."""
+        self.searched += 1
+        return self.searched > self.nodes or \
+            player.time_left() < player.TIMER_THRESHOLD
+
+# ------------------------------------------------------------------------------
 
-        score = scoring_function_longest_path(gamestate, player) + 1
 
-        if score > own_longest_path:
-            own_longest_path = score
+class TimeManager:
+    """Time management policy of iterative deepening. Before every new
+    iteration, the manager predicts the time it takes from the time of the
+    previous iteration and the effective branching factor measured between
+    the last iterations, and stops the search if the iteration cannot finish
+    within the time allotted to the move. The time the iteration would have
+    spent until the timeout is saved instead.
 
-    for move in game.get_legal_moves(game.get_opponent(player)):
+    All times are read from `CustomPlayer.time_left`, in milliseconds.
 
+    Parameters
+    ----------
+    total : float (optional)
+        The total number of milliseconds the agent may use over the whole
+        game. Every move is then allotted a share of the time that is left,
+        weighted toward the midgame, where the search decides most games. If
+        None, every move may use the whole time of its turn.
+
+    midgame_weight : float (optional)
+        The factor by which the share of a move in the middle of the game
+        (half of the cells blocked) exceeds the share of a move in the
+        opening or endgame.
+
+    branching : float (optional)
+        The effective branching factor assumed until two iterations have
+        been measured.
+    """
+
+    def __init__(self, total=None, midgame_weight=2., branching=4.):
+        self.total = total
+        self.midgame_weight = midgame_weight
+        self.branching = branching
+        self.remaining = total
+        self.move_count = -1
+
+    def allot(self, game):
+        """Return the number of milliseconds allotted to the next move from
+        the total time that is left, or infinity without a total time."""
+        if self.total is None:
+            return float('inf')
+
+        # Every player blocks one cell per move, which bounds the number of
+        # moves left to the agent.
+        blank = len(game.get_blank_spaces())
+        moves_left = max(1., blank / 2.)
+        phase = 1. - blank / float(game.width * game.height)
+        weight = 1. + (self.midgame_weight - 1.) * 4. * phase * (1. - phase)
+        return self.remaining * min(1., weight / moves_left)
+
+    def start(self, game, player):
+        """Start the time management of a move."""
+        # A move count that went back means that a new game started.
+        if game.move_count < self.move_count:
+            self.remaining = self.total
+        self.move_count = game.move_count
+
+        self.start_left = player.time_left()
+        self.available = min(self.start_left - player.TIMER_THRESHOLD,
+                             self.allot(game))
+        self.last_left = self.start_left
+        self.times = []
+
+    def iteration_done(self, player):
+        """Record the time of the iteration that just finished, and return
+        True if the next iteration can finish within the allotted time."""
+        time_left = player.time_left()
+        self.times.append(self.last_left - time_left)
+        self.last_left = time_left
+
+        branching = self.branching
+        if len(self.times) > 1 and self.times[-2] > 0:
+            branching = max(1., self.times[-1] / self.times[-2])
+
+        elapsed = self.start_left - time_left
+        return elapsed + self.times[-1] * branching <= self.available
+
+    def stop(self, player):
+        """End the time management of a move, charging the time it took to
+        the total time."""
+        if self.remaining is not None:
+            self.remaining -= self.start_left - player.time_left()
+
+# ------------------------------------------------------------------------------
+
+
+class OpeningBook:
+    """Table of precomputed moves for the first plies of the game, keyed by
+    the canonical key of the game state (see `isolation.Board.canonical_key`),
+    so that one entry serves all symmetric game states. The moves are stored
+    in the canonical form of the state. Books are built offline by
+    `opening_book.py`.
+
+    The file starts with a header holding a magic string, the board size and
+    the number of entries, followed by the entries sorted by key. Every entry
+    holds the 64 bit key and the row and column of the move. The file is only
+    read on the first probe, so that an agent can be configured with a book
+    without paying for it until the book is needed.
+
+    Parameters
+    ----------
+    path : str
+        The path of the book file.
+    """
+
+    MAGIC = b'ISOB'
+    HEADER = struct.Struct('<4sBBI')
+    ENTRY = struct.Struct('<QBB')
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = None
+        self.moves = None
+
+    def load(self):
+        """Read the entries of the book file."""
+        with open(self.path, 'rb') as book_file:
+            data = book_file.read()
+        magic, self.width, self.height, count = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC:
+            raise ValueError("Not an opening book: {}".format(self.path))
+        entries = list(self.ENTRY.iter_unpack(
+            data[self.HEADER.size:self.HEADER.size + count * self.ENTRY.size]))
+        self.keys = [key for key, _, _ in entries]
+        self.moves = [(row, col) for _, row, col in entries]
+
+    def probe(self, game):
+        """Return the book move of the game state, or None if the book has
+        no entry for it."""
+        if self.keys is None:
+            self.load()
+        if (game.width, game.height) != (self.width, self.height):
+            return None
+        key, symmetry = game.canonical_key()
+        idx = bisect.bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            return symmetry.invert(self.moves[idx])
+        return None
+
+    @classmethod
+    def write(cls, path, width, height, entries):
+        """Write a book file from a dict mapping keys to moves."""
+        with open(path, 'wb') as book_file:
+            book_file.write(cls.HEADER.pack(cls.MAGIC, width, height, len(entries)))
+            for key in sorted(entries):
+                book_file.write(cls.ENTRY.pack(key, *entries[key]))
+
+    def __getstate__(self):
+        # Other processes read the book file themselves.
+        return self.path
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+# ------------------------------------------------------------------------------
+
+
+# Search state shared by the parent process with its pool of worker processes;
+# set by `_init_worker()` in every worker.
+_WORKER_STATE = {}
+
+
+def _init_worker(root_window, pondering, helpers):
+    """Initialize a worker process of a `CustomPlayer` pool.
+
+    Parameters
+    ----------
+    root_window : multiprocessing.Array
+        A shared array holding the generation of the current root search and
+        the best score found for it so far (the shared alpha bound).
+
+    pondering : multiprocessing.RawValue
+        A shared integer holding the generation of the pondering search that
+        may run, or -1 if pondering has to stop.
+
+    helpers : multiprocessing.RawValue
+        A shared integer holding the generation of the Lazy SMP helpers that
+        may run, or -1 if the helpers have to stop.
+    """
+    _WORKER_STATE['root_window'] = root_window
+    _WORKER_STATE['pondering'] = pondering
+    _WORKER_STATE['helpers'] = helpers
+
+
+def _search_root_move(player, game, move, depth, deadline, generation):
+    """Search a single root move in a worker process.
+
+    The player and the game are unpickled together, so the player object
+    remains registered in the game. The search reads the alpha bound shared
+    by all root moves of the same generation before it starts, and publishes
+    its score if it improves on that bound.
+
+    Parameters
+    ----------
+    player : CustomPlayer
+        A copy of the searching agent
+
+    game : isolation.Board
+        A copy of the game at the root of the search
+
+    move : (int, int)
+        The root move to search
+
+    depth : int
+        The depth of the root search
+
+    deadline : float
+        The `timeit.default_timer()` value at which the move is due; the
+        search aborts `TIMER_THRESHOLD` milliseconds before it
+
+    generation : int
+        The number of the root search this move belongs to
+
+    Returns
+    ----------
+    ((int, int), float, float) or None
+        The move, its score and the alpha bound the move was searched with,
+        or None if the search timed out.
+    """
+    root_window = _WORKER_STATE['root_window']
+    player.time_left = lambda: 1000 * (deadline - timeit.default_timer())
+
+    with root_window.get_lock():
+        alpha = root_window[1] if root_window[0] == generation else float('-inf')
+
+    # The bound is lowered just below the best score, so that a move which
+    # ties with it gets an exact score, and ties are broken by the order of
+    # the root moves like in the serial search, whichever worker finishes
+    # first.
+    alpha = math.nextafter(alpha, float('-inf'))
+
+    try:
         gamestate = game.forecast_move(move)
+        score = player.search_child(gamestate, depth - 1, alpha)
+    except Timeout:
+        return None
+
+    with root_window.get_lock():
+        if root_window[0] == generation and score > root_window[1]:
+            root_window[1] = score
+
+    return move, score, alpha
+
+
+def _lazy_smp_helper(player, game, deadline, seed, generation):
+    """Run iterative deepening in a worker process to fill the shared
+    transposition table of a Lazy SMP search. Every helper shuffles the
+    moves before ordering them and starts at a depth depending on its seed,
+    so that helpers explore different parts of the tree first.
+
+    Parameters
+    ----------
+    player : CustomPlayer
+        A copy of the searching agent, attached to the shared table
+
+    game : isolation.Board
+        A copy of the game at the root of the search
+
+    deadline : float
+        The `timeit.default_timer()` value at which the move is due; the
+        search aborts `TIMER_THRESHOLD` milliseconds before it
+
+    seed : int
+        The number of the helper, used to perturb its search
+
+    generation : int
+        The number of the search the helper belongs to; it stops as soon as
+        the shared helper generation changes, i.e. when the move is returned
+    """
+    helpers = _WORKER_STATE['helpers']
+    player.time_left = lambda: 1000 * (deadline - timeit.default_timer()) \
+        if helpers.value == generation else float('-inf')
+    player.ordering = True
+    player.noise = random.Random(seed)
+    depth = 1 + seed % 2
+    try:
+        while True:
+            score, _ = getattr(player, player.method)(game, depth)
+            if math.isinf(score):
+                break
+            depth += 1
+    except Timeout:
+        pass
+
+
+def _ponder(player, game, deadline, generation):
+    """Run iterative deepening in a worker process on the position after the
+    move of the agent, while the opponent is thinking. The search covers all
+    replies of the opponent and fills the shared transposition table, which
+    the agent probes once the reply arrives.
+
+    Parameters
+    ----------
+    player : CustomPlayer
+        A copy of the searching agent, attached to the shared table
 
-        score = scoring_function_longest_path(gamestate, game.get_opponent(player)) + 1
+    game : isolation.Board
+        A copy of the game after the move of the agent
 
-        if score > nme_longest_path:
-            nme_longest_path = score
+    deadline : float
+        The `timeit.default_timer()` value at which pondering stops at the
+        latest, in case the agent is not notified of the reply
+
+    generation : int
+        The number of the pondering search; it stops as soon as the shared
+        pondering generation changes
+    """
+    pondering = _WORKER_STATE['pondering']
+    player.time_left = lambda: 1000 * (deadline - timeit.default_timer()) \
+        if pondering.value == generation else float('-inf')
+    player.budget = TimeBudget()
+    depth = 1
+    try:
+        while True:
+            if player.method == 'pvs':
+                score, _ = player.pvs(game, depth)
+            else:
+                score, _ = getattr(player, player.method)(game, depth, maximizing_player=False)
+            if math.isinf(score):
+                break
+            depth += 1
+    except Timeout:
+        pass
 
-    return float(own_longest_path - nme_longest_path)
 # ------------------------------------------------------------------------------
 
 
@@ -164,31 +1101,295 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'pvs', 'mcts'} (optional)
+        The name of the search method to use in get_move(). 'mcts' runs a
+        Monte Carlo tree search until the budget expires, ignoring the search
+        depth, the tables, the time manager and pondering.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    inplace : boolean (optional)
+        Flag indicating whether the search applies and reverts moves on the
+        board in place with `apply_move()` and `undo_move()` (True), or
+        creates a copy of the board for every child with `forecast_move()`
+        (False).
+
+    tt_size : int (optional)
+        The number of slots of the transposition table used by minimax and
+        alphabeta. The table is disabled if the size is 0 or None.
+
+    tt_replacement : {'depth', 'always'} (optional)
+        The replacement policy of the transposition table.
+
+    ordering : boolean (optional)
+        Flag indicating whether alphabeta orders moves by the principal
+        variation of the previous iteration, killer moves and the history
+        heuristic (True), or searches them in the order of
+        `get_legal_moves()` (False).
+
+    aspiration : float (optional)
+        Half width of the aspiration window placed around the score of the
+        previous iteration when iterative deepening with alphabeta or pvs.
+        Aspiration windows are disabled if the value is None.
+
+    aspiration_growth : float (optional)
+        Factor by which the half width of the aspiration window grows every
+        time the search fails high or low.
+
+    processes : int (optional)
+        The number of worker processes used to search in parallel. The pool
+        of workers is created on the first call to get_move() and persists
+        until close() is called. Parallel search is disabled if the value is
+        0 or None. It requires the score function and both players to be
+        picklable.
+
+    parallel : {'root', 'lazy'} (optional)
+        The parallel search strategy. 'root' splits the root moves of every
+        iteration across the workers. 'lazy' (Lazy SMP) lets every worker run
+        its own iterative deepening search next to the search of the agent,
+        sharing results only through a transposition table in shared memory.
+
+    ponder : float (optional)
+        The maximum number of milliseconds to search on the time of the
+        opponent after every move. The search runs in a worker process (see
+        `processes`) and fills a transposition table in shared memory; it
+        stops when `move_received()` is called or the next move is searched.
+        Pondering is disabled if the value is 0 or None.
+
+    keep_tables : boolean (optional)
+        Flag indicating whether the transposition table, the principal
+        variation and the move ordering tables are kept across the moves of
+        a game and aged (True), or cleared before every move (False). They
+        are always cleared when a new game or a different board is detected.
+
+    budget : TimeBudget (optional)
+        The budget that decides when the search of a move is aborted, e.g. a
+        `NodeBudget` to search a fixed number of nodes per move, or a
+        `PollingTimeBudget` to read the clock less often. Defaults to a
+        `TimeBudget` with the `timeout` threshold.
+
+    time_manager : TimeManager (optional)
+        The policy that decides whether iterative deepening starts another
+        iteration. If None, iterations continue until the search times out.
+
+    solve_partitions : boolean (optional)
+        Flag indicating whether alphabeta solves positions in which the
+        players are separated exactly (see `solve_partition()`) and treats
+        them as terminal (True), or searches them like any other position
+        (False).
+
+    book : OpeningBook or str (optional)
+        The opening book, or the path of the book file, probed before every
+        search. Moves found in the book are played without searching.
+
+    eval_cache : int (optional)
+        The number of evaluations kept in an `EvalCache` wrapping the score
+        function, across iterations and moves. The cache is disabled if the
+        size is 0 or None.
+
+    batch : boolean (optional)
+        Flag indicating whether alphabeta evaluates all children of a node
+        at depth 1 with a single call to the `batch` attribute of the score
+        function (True), or one child at a time (False). Batches are only
+        used if NumPy is available, the score function has a `batch`
+        attribute and the board has at most 64 cells.
+
+    exploration : float (optional)
+        The exploration constant of the UCT selection of the 'mcts' method.
+
+    rollout_policy : {'random', 'greedy'} (optional)
+        The policy of the rollouts of the 'mcts' method (see
+        `isolation.rollout.rollout()`).
     """
 
+    # The maximum number of positions whose partition results are memoized.
+    PARTITION_CACHE_SIZE = 2**16
+
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 inplace=False, tt_size=None, tt_replacement='depth',
+                 ordering=False, aspiration=None, aspiration_growth=4.,
+                 processes=None, parallel='root', ponder=None,
+                 keep_tables=False, budget=None,
+                 time_manager=None, solve_partitions=False, book=None,
+                 eval_cache=None, batch=False, exploration=math.sqrt(2),
+                 rollout_policy='random'):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
+        if eval_cache:
+            self.score = EvalCache(score_fn, eval_cache)
+        self.batch = batch
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.inplace = inplace
+        self.tt = None
+        if tt_size:
+            self.tt = TranspositionTable(tt_size, tt_replacement)
+        self.ordering = ordering
+        self.pv_table = {}
+        self.killers = {}
+        self.history = Counter()
+        self.aspiration = aspiration
+        self.aspiration_growth = aspiration_growth
+        self.processes = processes
+        self.parallel = parallel
+        self.pool = None
+        self.root_window = None
+        self.generation = 0
+        self.noise = None
+        self.ponder = ponder
+        self.pondering = None
+        self.ponder_generation = 0
+        self.helpers = None
+        self.helper_generation = 0
+        self.keep_tables = keep_tables
+        self.last_position = None
+        self.budget = budget or TimeBudget()
+        self.time_manager = time_manager
+        self.solve_partitions = solve_partitions
+        self.partitions = {}
+        if isinstance(book, str):
+            book = OpeningBook(book)
+        self.book = book
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy
+        self.rollouts = 0
+        self.rollouts_per_second = 0.
+
+    def __getstate__(self):
+        # The worker pool and the timer of the current move cannot be sent
+        # to other processes.
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['root_window'] = None
+        state['pondering'] = None
+        state['helpers'] = None
+        state['time_left'] = None
+        state['partitions'] = {}
+        return state
+
+    def close(self):
+        """Terminate the worker processes of the parallel search, if any, and
+        release the shared transposition table."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.root_window = None
+            self.pondering = None
+            self.helpers = None
+        if isinstance(self.tt, SharedTranspositionTable):
+            self.tt.close()
+            self.tt = TranspositionTable(self.tt.size, self.tt.replacement)
+
+    def worker_pool(self):
+        """Return the pool of worker processes, creating it on first use. For
+        Lazy SMP and pondering, the transposition table is moved to shared
+        memory first."""
+        if self.pool is None:
+            if (self.parallel == 'lazy' or self.ponder) and \
+                    not isinstance(self.tt, SharedTranspositionTable):
+                tt = self.tt or TranspositionTable()
+                self.tt = SharedTranspositionTable(tt.size, tt.replacement)
+            self.root_window = multiprocessing.Array('d', 2)
+            self.pondering = multiprocessing.RawValue('i', -1)
+            self.helpers = multiprocessing.RawValue('i', -1)
+            self.pool = multiprocessing.Pool(self.processes or 1, _init_worker,
+                                              (self.root_window, self.pondering,
+                                               self.helpers))
+        return self.pool
+
+    def clear_tables(self):
+        """Remove all entries from the transposition table, the move
+        ordering tables and the memoized partition results."""
+        if self.tt is not None:
+            self.tt.clear()
+        self.pv_table.clear()
+        self.killers.clear()
+        self.history.clear()
+        self.partitions.clear()
+
+    def age_tables(self, game):
+        """Prepare the tables kept from the previous moves for a new search.
+        Entries of earlier searches become the first to be replaced in the
+        transposition table, the history scores are halved, and the killer
+        moves and principal variation moves of plies already played are
+        dropped. All tables are cleared if
+        the game is not the continuation of the game of the previous move,
+        i.e. a new game started or the board changed.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+        """
+        position = game.width, game.height, game.move_count
+        previous, self.last_position = self.last_position, position
+        if previous is None or previous[:2] != position[:2] or \
+                previous[2] >= position[2]:
+            self.clear_tables()
+            return
+
+        if self.tt is not None:
+            self.tt.new_search()
+        for move, score in list(self.history.items()):
+            if score > 1:
+                self.history[move] = score // 2
+            else:
+                del self.history[move]
+        for ply in [ply for ply in self.killers if ply < game.move_count]:
+            del self.killers[ply]
+        for ply in [ply for ply in self.pv_table if ply < game.move_count]:
+            del self.pv_table[ply]
+
+    def start_pondering(self, game):
+        """Start searching the position after the move of the agent in a
+        worker process, until the reply of the opponent is received.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            game state after the move of the agent
+        """
+        if not game.get_legal_moves():
+            return
+        pool = self.worker_pool()
+        self.ponder_generation += 1
+        self.pondering.value = self.ponder_generation
+        deadline = timeit.default_timer() + self.ponder / 1000.
+        pool.apply_async(_ponder, (self, game, deadline, self.ponder_generation))
+
+    def stop_pondering(self):
+        """Stop the pondering search, if any."""
+        if self.pondering is not None:
+            self.pondering.value = -1
+
+    def move_received(self, move):
+        """Notify the agent of the move of the opponent, which was applied to
+        the game (see `isolation.Board.play`). This stops pondering, so that
+        the worker is free when the agent searches its next move.
+
+        Parameters
+        ----------
+        move : (int, int)
+            The move of the opponent
+        """
+        self.stop_pondering()
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
         result before the time limit expires.
 
         This function must perform iterative deepening if self.iterative=True,
-        and it must use the search method (minimax or alphabeta) corresponding
-        to the self.method value.
+        and it must use the search method (minimax, alphabeta or pvs)
+        corresponding to the self.method value.
 
         **********************************************************************
         NOTE: If time_left < 0 when this function returns, the agent will
@@ -219,10 +1420,18 @@ class CustomPlayer:
         """
 
         self.time_left = time_left
+        self.budget.start()
+        self.stop_pondering()
 
         if not legal_moves:
             return (-1, -1)
 
+        # Positions of the opening book are answered without any search.
+        if self.book is not None:
+            move = self.book.probe(game)
+            if move in legal_moves:
+                return move
+
         # If the initial position was not set, set the player close to the
         # middle. The // operator means INTEGER DIVISION.
         if not game.move_count:
@@ -236,6 +1445,34 @@ class CustomPlayer:
         best_possible_move = random.choice(legal_moves)
         best_possible_score = float('-inf')
 
+        # Monte Carlo tree search runs its own loop until the budget expires.
+        if self.method == 'mcts':
+            return self.mcts(game, legal_moves) or best_possible_move
+
+        # Remember the root position so that an in-place search interrupted
+        # by a Timeout can revert the moves it left on the board.
+        root_move_count = game.move_count
+
+        # The pool of the pondering search is created before the search, so
+        # that its start-up is not taken from the time left after the search.
+        if self.ponder:
+            self.worker_pool()
+
+        # The transposition table and the move ordering tables start empty for
+        # every move, and are carried over between iterations. When they are
+        # kept across moves (or filled by pondering), they are only aged.
+        if self.keep_tables or self.ponder:
+            self.age_tables(game)
+        else:
+            self.clear_tables()
+
+        # Lazy SMP helpers search next to this process until the move is due.
+        if self.processes and self.parallel == 'lazy':
+            self.start_helpers(game)
+
+        if self.time_manager is not None:
+            self.time_manager.start(game, self)
+
         try:
 
             # The first iteration level is set to 1 in case of `self.iterative`
@@ -246,35 +1483,245 @@ class CustomPlayer:
             else:
                 depth = self.search_depth
 
+            # The score of the previous iteration centers the aspiration
+            # window of the next one.
+            score = None
+
             # Initialize an infinite loop to find the best possible value.
             while True:
 
                 # Dispatch parameters to the method which was defined in the
                 # game setup.
-                score, possible_move = \
-                    getattr(self, self.method)(game, depth)
+                if self.processes and self.parallel == 'root':
+                    score, possible_move = \
+                        self.parallel_search(game, depth)
+                else:
+                    score, possible_move = \
+                        self.search_window(game, depth, score)
 
                 # update score and move if a better move was found
                 if score > best_possible_score:
                     best_possible_score = score
                     best_possible_move = possible_move
 
+                # An infinite score proves a win or a loss, and searching
+                # deeper cannot change it. This also ends the search once the
+                # whole game tree was exhausted, as a tree that is searched to
+                # its end only has terminal leaves and thus an infinite score.
+                if math.isinf(score):
+                    break
+
                 # in iterative mode, a new iteration should be triggered with
                 # an additional level of depth. This is done until a Timeout
-                # Exception is thrown or until all levels were discovered.
+                # Exception is thrown, until all levels were discovered, or
+                # until the time manager predicts that the next iteration
+                # cannot finish in time.
                 if self.iterative:
                     depth += 1
                 else:
                     break
 
+                if self.time_manager is not None and \
+                        not self.time_manager.iteration_done(self):
+                    break
+
         except Timeout as t:
             # When a Timeout Exception is catched, the last discovered best
             # move is returned.
-            return best_possible_move
+            if self.inplace:
+                while game.move_count > root_move_count:
+                    game.undo_move()
+
+        # The helpers stop with the search, so that the workers are free for
+        # the next move or for pondering.
+        self.stop_helpers()
+
+        if self.time_manager is not None:
+            self.time_manager.stop(self)
+
+        if self.ponder:
+            self.start_pondering(game.forecast_move(best_possible_move))
 
         # Return the best move found.
         return best_possible_move
 
+# ------------------------------------------------------------------------------
+
+    def search_window(self, game, depth, guess=None):
+        """Run the configured search method from the root, using an aspiration
+        window around the expected score if aspiration windows are enabled.
+        When the score falls outside of the window, the failing side of the
+        window is widened by `aspiration_growth` and the search is repeated
+        until the score is exact.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        guess : float (optional)
+            The expected score, e.g., the score of the previous iteration
+
+        Returns
+        ----------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        search = getattr(self, self.method)
+
+        # The full window is used without a finite guess, and for minimax,
+        # which does not take a window.
+        if self.aspiration is None or self.method == 'minimax' or \
+                guess is None or math.isinf(guess):
+            return search(game, depth)
+
+        delta = self.aspiration
+        alpha, beta = guess - delta, guess + delta
+
+        while True:
+            score, move = search(game, depth, alpha, beta)
+
+            # An infinite score is exact even outside of the window.
+            if alpha < score < beta or math.isinf(score):
+                return score, move
+
+            delta *= self.aspiration_growth
+            if score <= alpha:
+                alpha = guess - delta
+            else:
+                beta = guess + delta
+
+# ------------------------------------------------------------------------------
+
+    def parallel_search(self, game, depth):
+        """Search the root moves in parallel in the worker pool. All root moves
+        of one search share the alpha bound through shared memory, so a move
+        that is searched after a good move was found only has to prove that
+        it is not better.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        Returns
+        ----------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+
+        Raises
+        ----------
+        Timeout
+            If the search of any root move did not finish in time.
+        """
+        pool = self.worker_pool()
+
+        self.generation += 1
+        with self.root_window.get_lock():
+            self.root_window[0] = self.generation
+            self.root_window[1] = float('-inf')
+
+        # The workers abort the search early enough for this process to
+        # collect their results before its own timer threshold.
+        deadline = timeit.default_timer() + \
+            (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+        tasks = [pool.apply_async(_search_root_move, (self, game, move, depth,
+                                                           deadline, self.generation))
+                 for move in game.get_legal_moves()]
+
+        best_score = float('-inf')
+        best_move = (-1, -1)
+        for task in tasks:
+            # Without a time limit (e.g. under a node budget), wait until
+            # the worker returns.
+            timeout = max(0., deadline - timeit.default_timer())
+            try:
+                result = task.get(None if math.isinf(timeout) else timeout)
+            except multiprocessing.TimeoutError:
+                raise Timeout()
+            if result is None:
+                raise Timeout()
+
+            # A score that does not exceed the alpha bound it was searched
+            # with is only an upper bound, and that move is worse than the
+            # one that set the bound. Among exact scores, the first of the
+            # best moves in move order is kept.
+            move, score, alpha = result
+            exact = score > alpha or alpha == float('-inf')
+            if exact and (score > best_score or best_move == (-1, -1)):
+                best_score = score
+                best_move = move
+
+        return best_score, best_move
+
+    def start_helpers(self, game):
+        """Start one Lazy SMP helper search per worker process. The helpers
+        stop when `stop_helpers()` is called, or on their own shortly before
+        the current move is due.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+        """
+        pool = self.worker_pool()
+        deadline = timeit.default_timer() + \
+            (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+        self.helper_generation += 1
+        self.helpers.value = self.helper_generation
+        for seed in range(self.processes):
+            pool.apply_async(_lazy_smp_helper,
+                             (self, game, deadline, seed, self.helper_generation))
+
+    def stop_helpers(self):
+        """Stop the Lazy SMP helper searches, if any."""
+        if self.helpers is not None:
+            self.helpers.value = -1
+
+    def search_child(self, game, depth, alpha=float("-inf")):
+        """Return the score of a child of the root, where the opponent holds
+        the initiative, using the configured search method.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The game state after a root move
+
+        depth : int
+            The remaining search depth
+
+        alpha : float
+            The best score of the agent that is already known at the root
+
+        Returns
+        ----------
+        float
+            The score of the child; exact if it exceeds alpha, otherwise an
+            upper bound of it
+        """
+        if self.method == 'pvs':
+            return -self.pvs(game, depth, float("-inf"), -alpha)[0]
+        if self.method == 'alphabeta':
+            return self.alphabeta(game, depth, alpha, float("inf"), False)[0]
+        return self.minimax(game, depth, False)[0]
+
 # ------------------------------------------------------------------------------
 
     def minimax(self, game, depth, maximizing_player=True):
@@ -303,9 +1750,9 @@ class CustomPlayer:
             The best move for the current branch; (-1, -1) for no legal moves
         """
 
-        # When the defined time is exhausted, a Timeout Exception is raised to
-        # end the search process.
-        if self.time_left() < self.TIMER_THRESHOLD:
+        # When the search budget is exhausted, a Timeout Exception is raised
+        # to end the search process.
+        if self.budget.expired(self):
             raise Timeout()
 
         # If a win or lose of my player was found, the relating utility() value
@@ -319,6 +1766,16 @@ class CustomPlayer:
         if depth == 0:
             return self.score(game, self), game.get_player_location(self)
 
+        # A position whose exact value is known from a search to at least the
+        # same depth is answered from the transposition table. The key distinguishes
+        # maximizing and minimizing layers of the same position.
+        if self.tt is not None:
+            key = (game.hash_key << 1) | maximizing_player
+            entry = self.tt.probe(key)
+            if entry is not None and entry[1] >= depth and \
+                    entry[3] == TranspositionTable.EXACT:
+                return entry[2], entry[4]
+
         # Best score and move are initialized, with regard to the
         # maximizing_player bool value.
         best_score = float('-inf') if maximizing_player else float('+inf')
@@ -327,13 +1784,15 @@ class CustomPlayer:
         # Iterate over all possible children.
         for move in game.get_legal_moves():
 
-            # A copy of the current game is created that reflects the current
-            # move. This is important to ensure progress in the search.
-            gamestate = game.forecast_move(move)
+            # The game state is advanced by the current move, either on a copy
+            # of the board or in place. This is important to ensure progress
+            # in the search.
+            gamestate = self.make_move(game, move)
 
             # Execute recursive minimax calls with depth reduced by one and
             # maximizing_player flipped to the opposite.
             score, _ = self.minimax(gamestate, depth-1, not maximizing_player)
+            self.unmake_move(gamestate)
 
             # If the last iteration found a move with a better score, best_score
             # and best_move are updated.
@@ -341,8 +1800,51 @@ class CustomPlayer:
                 best_score = score
                 best_move = move
 
+        if self.tt is not None:
+            self.tt.store(key, depth, best_score, TranspositionTable.EXACT, best_move)
+
         return best_score, best_move
 
+# ------------------------------------------------------------------------------
+
+    def make_move(self, game, move):
+        """Return the game state after the active player applied the given
+        move. In place mode the move is applied to `game` itself and must be
+        reverted with `unmake_move()`, otherwise a copy of the board is
+        returned and `game` remains unchanged.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        isolation.Board
+            The game state with the move applied
+        """
+        if self.inplace:
+            game.apply_move(move)
+            return game
+        return game.forecast_move(move)
+
+    def unmake_move(self, game):
+        """Revert the move applied by the last `make_move()` call on the given
+        game state. This is a no-op if the search is not running in place.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The game state that was returned by `make_move()`
+        """
+        if self.inplace:
+            game.undo_move()
+
 # ------------------------------------------------------------------------------
 
     def score_is_better(self, score, best_score, maximizing_player):
@@ -409,7 +1911,7 @@ class CustomPlayer:
             The best move for the current branch; (-1, -1) for no legal moves
         """
 
-        if self.time_left() < self.TIMER_THRESHOLD:
+        if self.budget.expired(self):
             raise Timeout()
 
         # If a win or lose of my player was found, the relating utility() value
@@ -417,27 +1919,84 @@ class CustomPlayer:
         if game.is_winner(self) or game.is_loser(self):
             return game.utility(self), game.get_player_location(self)
 
+        # Once the players are separated, the winner is known without any
+        # further search, and the position is handled like a terminal one.
+        # Leaves are left to the score function, as the solve costs far more
+        # than an evaluation.
+        if self.solve_partitions and depth > 0:
+            solved = self.partition(game)
+            if solved is not None:
+                active_length, inactive_length, move = solved
+                active = game.active_player == self
+                if (active_length > inactive_length) == active:
+                    score = float('inf')
+                else:
+                    score = float('-inf')
+                if not active:
+                    move = game.get_player_location(self)
+                return score, move
+
         # When depth has reached 0, the nodes must be evaluted by calling the
         # scoring function. The score of the relating move and the relating
         # move are returned.
         if depth == 0:
             return self.score(game, self), game.get_player_location(self)
 
+        # The key distinguishes maximizing and minimizing layers of the same
+        # position in the transposition and principal variation tables.
+        if self.tt is not None or self.ordering:
+            key = (game.hash_key << 1) | maximizing_player
+        window = alpha, beta
+
+        # Bounds from the transposition table narrow the search window, and
+        # answer the position outright if they are exact or close the window.
+        if self.tt is not None:
+            entry = self.tt.probe(key)
+            if entry is not None and entry[1] >= depth:
+                value, flag = entry[2], entry[3]
+                if flag == TranspositionTable.EXACT:
+                    return value, entry[4]
+                if flag == TranspositionTable.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, entry[4]
+            window = alpha, beta
+
         # Best score and move are initialized, with regard to the
         # maximizing_player bool value.
         best_score = float('-inf') if maximizing_player else float('+inf')
         best_move = (-1, -1)
 
+        # Searching the most promising children first leads to earlier
+        # cutoffs.
+        moves = game.get_legal_moves()
+        if self.ordering:
+            self.order_moves(game, moves, key)
+
+        # All children of a node at depth 1 are leaves, which a batch
+        # heuristic evaluates at once.
+        leaf_scores = None
+        if depth == 1 and self.batch:
+            leaf_scores = self.evaluate_leaves(game, moves)
+
         # Iterate over all possible children.
-        for move in game.get_legal_moves():
+        for idx, move in enumerate(moves):
 
-            # A copy of the current game is created that reflects the current
-            # move. This is important to ensure progress in the search.
-            gamestate = game.forecast_move(move)
+            if leaf_scores is not None:
+                score = leaf_scores[idx]
 
-            # Execute recursive minimax calls with depth reduced by one and
-            # maximizing_player flipped to the opposite.
-            score, _ = self.alphabeta(gamestate, depth-1, alpha, beta, not maximizing_player)
+            else:
+                # The game state is advanced by the current move, either on a
+                # copy of the board or in place. This is important to ensure
+                # progress in the search.
+                gamestate = self.make_move(game, move)
+
+                # Execute recursive minimax calls with depth reduced by one and
+                # maximizing_player flipped to the opposite.
+                score, _ = self.alphabeta(gamestate, depth-1, alpha, beta, not maximizing_player)
+                self.unmake_move(gamestate)
 
             # If the last iteration found a move with a better score, best_score
             # and best_move are updated.
@@ -448,12 +2007,382 @@ class CustomPlayer:
             # Alpha-Beta addition
             if maximizing_player:
                 if best_score >= beta:
+                    if self.ordering:
+                        self.record_cutoff(game, move, depth)
                     break
                 alpha = max(alpha, best_score)
 
             if not maximizing_player:
                 if best_score <= alpha:
+                    if self.ordering:
+                        self.record_cutoff(game, move, depth)
                     break
                 beta = min(beta, best_score)
 
-        return best_score, best_move
\ No newline at end of file
+        # Scores outside of the search window are only bounds of the value.
+        if self.tt is not None or self.ordering:
+            if best_score <= window[0]:
+                flag = TranspositionTable.UPPER
+            elif best_score >= window[1]:
+                flag = TranspositionTable.LOWER
+            else:
+                flag = TranspositionTable.EXACT
+            if self.tt is not None:
+                self.tt.store(key, depth, best_score, flag, best_move)
+            if self.ordering and flag == TranspositionTable.EXACT:
+                self.pv_table.setdefault(game.move_count, {})[key] = best_move
+
+        return best_score, best_move
+
+# ------------------------------------------------------------------------------
+
+    def partition(self, game):
+        """Return the result of `solve_partition()` for the game, memoized by
+        the Zobrist hash of the game state, failures included. The solve is
+        aborted with a `Timeout` when the search budget expires.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+        """
+        key = game.hash_key
+        if key in self.partitions:
+            return self.partitions[key]
+        if len(self.partitions) >= self.PARTITION_CACHE_SIZE:
+            self.partitions.clear()
+        solved = self.partitions[key] = \
+            solve_partition(game, expired=lambda: self.budget.expired(self))
+        return solved
+
+# ------------------------------------------------------------------------------
+
+    def evaluate_leaves(self, game, moves):
+        """Evaluate the children reached by each of the moves with a single
+        call to the batch version of the score function. Terminal children
+        are scored by their utility, like `alphabeta()` does.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        moves : list<(int, int)>
+            The legal moves of the active player
+
+        Returns
+        ----------
+        list<float> or None
+            The scores of the children in the order of the moves, or None if
+            the children cannot be evaluated as a batch.
+        """
+        batch_fn = getattr(self.score, 'batch', None)
+        if batch_fn is None or self.solve_partitions:
+            return None
+        positions = PositionBatch.from_children(game, moves, self)
+        if positions is None:
+            return None
+
+        # The budget is charged once for the whole batch.
+        if self.budget.expired(self):
+            raise Timeout()
+
+        return positions.with_utility(batch_fn(positions)).tolist()
+
+# ------------------------------------------------------------------------------
+
+    def order_moves(self, game, moves, key):
+        """Sort the list of moves in place so that the most promising moves
+        are searched first: the best move of the position from the principal
+        variation of the previous iteration (or from the transposition table),
+        then the killer moves that caused cutoffs at the same ply, then all
+        other moves by their history score.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        moves : list<(int, int)>
+            The legal moves in the current game state
+
+        key : int
+            The key of the current search node
+        """
+        if self.noise is not None:
+            self.noise.shuffle(moves)
+        moves.sort(key=self.history.__getitem__, reverse=True)
+
+        best_move = self.pv_table.get(game.move_count, {}).get(key)
+        if best_move is None and self.tt is not None:
+            entry = self.tt.probe(key)
+            if entry is not None:
+                best_move = entry[4]
+
+        promoted = self.killers.get(game.move_count, [])[::-1]
+        if best_move is not None:
+            promoted.append(best_move)
+        for move in promoted:
+            if move in moves:
+                moves.remove(move)
+                moves.insert(0, move)
+
+    def record_cutoff(self, game, move, depth):
+        """Remember a move that caused a cutoff. The move becomes a killer
+        move for the current ply, and its history score grows with the square
+        of the remaining depth.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        move : (int, int)
+            The move that caused the cutoff
+
+        depth : int
+            The remaining search depth of the current node
+        """
+        killers = self.killers.setdefault(game.move_count, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] += depth * depth
+
+# ------------------------------------------------------------------------------
+
+    def pvs(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+        """Implement Principal Variation Search (NegaScout) in the negamax
+        formulation. The first child of every node is searched with the full
+        window, all other children with a null window that only proves that
+        they are not better than the best move so far. A child that fails
+        high is searched again with the full window.
+
+        For the same depth and move order, the search returns the same score
+        and move as `alphabeta()`, while visiting fewer nodes when the first
+        child of a node is usually the best one.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha : float
+            The lower bound of the search window, from the point of view of
+            the active player
+
+        beta : float
+            The upper bound of the search window, from the point of view of
+            the active player
+
+        Returns
+        ----------
+        float
+            The score for the current search branch from the point of view of
+            the active player
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+
+        if self.budget.expired(self):
+            raise Timeout()
+
+        # The active player loses if it cannot move anymore.
+        moves = game.get_legal_moves()
+        if not moves:
+            return float('-inf'), game.get_player_location(self)
+
+        # The heuristic value is always computed for this agent and has to be
+        # negated on the opponent's layers.
+        maximizing_player = game.active_player == self
+        sign = 1. if maximizing_player else -1.
+
+        if depth == 0:
+            return sign * self.score(game, self), game.get_player_location(self)
+
+        # The tables share their entries with alphabeta and store values from
+        # the point of view of this agent, so bounds are flipped on the
+        # opponent's layers.
+        if self.tt is not None or self.ordering:
+            key = (game.hash_key << 1) | maximizing_player
+
+        if self.tt is not None:
+            entry = self.tt.probe(key)
+            if entry is not None and entry[1] >= depth:
+                value, flag = sign * entry[2], entry[3]
+                if flag != TranspositionTable.EXACT and not maximizing_player:
+                    flag = TranspositionTable.LOWER + TranspositionTable.UPPER - flag
+                if flag == TranspositionTable.EXACT:
+                    return value, entry[4]
+                if flag == TranspositionTable.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, entry[4]
+        window = alpha, beta
+
+        if self.ordering:
+            self.order_moves(game, moves, key)
+
+        best_score = float('-inf')
+        best_move = (-1, -1)
+
+        for idx, move in enumerate(moves):
+
+            gamestate = self.make_move(game, move)
+
+            if idx == 0:
+                score = -self.pvs(gamestate, depth-1, -beta, -alpha)[0]
+            else:
+                # Null window search, followed by a full window search if the
+                # move turns out to be better than the best move so far. The
+                # null window score of a leaf is exact and needs no research.
+                scout = math.nextafter(alpha, float('inf'))
+                score = -self.pvs(gamestate, depth-1, -scout, -alpha)[0]
+                if alpha < score < beta and depth > 1:
+                    score = -self.pvs(gamestate, depth-1, -beta, -score)[0]
+
+            self.unmake_move(gamestate)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+
+            if best_score >= beta:
+                if self.ordering:
+                    self.record_cutoff(game, move, depth)
+                break
+            alpha = max(alpha, best_score)
+
+        if self.tt is not None or self.ordering:
+            if best_score <= window[0]:
+                flag = TranspositionTable.UPPER
+            elif best_score >= window[1]:
+                flag = TranspositionTable.LOWER
+            else:
+                flag = TranspositionTable.EXACT
+            if self.tt is not None:
+                stored_flag = flag
+                if flag != TranspositionTable.EXACT and not maximizing_player:
+                    stored_flag = TranspositionTable.LOWER + TranspositionTable.UPPER - flag
+                self.tt.store(key, depth, sign * best_score, stored_flag, best_move)
+            if self.ordering and flag == TranspositionTable.EXACT:
+                self.pv_table.setdefault(game.move_count, {})[key] = best_move
+
+        return best_score, best_move
+
+# ------------------------------------------------------------------------------
+
+    def mcts(self, game, legal_moves):
+        """Implement a Monte Carlo tree search with UCT selection. Every
+        iteration descends the tree by the upper confidence bound of the
+        children, stops at the first child that was not visited yet, and
+        plays a rollout from it to the end of the game on bitmasks (see
+        `isolation.rollout`). The search runs until the budget expires, and
+        the number of rollouts and the rollouts per second are kept in
+        `rollouts` and `rollouts_per_second`.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player
+
+        Returns
+        ----------
+        tuple(int, int)
+            The most visited move at the root, or None if the budget expired
+            before the first rollout
+        """
+        targets = move_table(game.width, game.height).targets
+        policy = self.rollout_policy
+        exploration = self.exploration
+
+        # The tree is stored in flat lists of integers indexed by node, which
+        # the garbage collector does not have to traverse, unlike one object
+        # per node. The children of a node are expanded all at once, in
+        # random order, at consecutive indices from first[node]; first[node]
+        # is -1 until the node is expanded. Wins are counted for the player
+        # who made the move leading to the node.
+        blocked, active, inactive = [0], [0], [0]
+        first, count, visits, wins = [-1], [0], [0], [0]
+
+        def expand(node, states):
+            first[node] = len(visits)
+            count[node] = len(states)
+            for state in states:
+                blocked.append(state[0])
+                active.append(state[1])
+                inactive.append(state[2])
+            first.extend([-1] * len(states))
+            count.extend([0] * len(states))
+            visits.extend([0] * len(states))
+            wins.extend([0] * len(states))
+
+        # The active player may not be placed yet, so the children of the
+        # root are created from the legal moves of the board.
+        root_moves = list(legal_moves)
+        random.shuffle(root_moves)
+        expand(0, [bitmask_state(game.forecast_move(move)) for move in root_moves])
+
+        start = timeit.default_timer()
+        self.rollouts = 0
+        while not self.budget.expired(self):
+            node = 0
+            path = [0]
+            while True:
+                if first[node] < 0:
+                    mask = blocked[node]
+                    states = [(mask | bit, inactive[node], idx)
+                              for bit, idx in targets[active[node]]
+                              if not mask & bit]
+                    random.shuffle(states)
+                    expand(node, states)
+                children = range(first[node], first[node] + count[node])
+                if not children:
+                    break
+
+                # Children that were not visited yet are tried first.
+                unvisited = [child for child in children if not visits[child]]
+                if unvisited:
+                    node = unvisited[0]
+                    path.append(node)
+                    break
+
+                log_visits = math.log(visits[node])
+                node = max(children, key=lambda child: wins[child] / visits[child] +
+                           exploration * math.sqrt(log_visits / visits[child]))
+                path.append(node)
+
+            # The rollout tells whether the player to move in the node wins,
+            # and the node counts the wins of the other player.
+            won = not rollout(targets, blocked[node], active[node], inactive[node],
+                              policy=policy)
+            for node in reversed(path):
+                visits[node] += 1
+                wins[node] += won
+                won = not won
+            self.rollouts += 1
+
+        elapsed = timeit.default_timer() - start
+        self.rollouts_per_second = self.rollouts / elapsed if elapsed > 0 else 0.
+
+        children = range(first[0], first[0] + count[0])
+        best = max(children, key=lambda child: visits[child])
+        if not visits[best]:
+            return None
+        return root_moves[best - first[0]]
@@ -0,0 +1,151 @@
+"""
+This file contains the `PositionBatch` class, which encodes a batch of game
+states of the same board as NumPy arrays, so that heuristics can evaluate all
+of them with a few vectorized mask operations instead of one call per state.
+
+NumPy is optional. If it cannot be imported, `AVAILABLE` is False and
+`PositionBatch.from_children()` always returns None, so callers fall back to
+evaluating the states one at a time.
+
+Heuristics support batches by exposing a `batch` attribute: a function that
+takes a `PositionBatch` and returns a NumPy vector with the score of every
+state, equal to the scores the heuristic returns for the states one by one.
+"""
+
+from .isolation import Board
+from .isolation import blocked_mask
+from .isolation import move_table
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+AVAILABLE = np is not None
+
+# Cells are stored in unsigned 64 bit masks, which limits batches to boards of
+# at most 64 cells.
+MAX_CELLS = 64
+
+_MASKS = {}
+
+
+def _masks(width, height):
+    """ Return the knight move masks of a board geometry as a NumPy array. """
+    masks = _MASKS.get((width, height))
+    if masks is None:
+        masks = _MASKS[(width, height)] = np.array(move_table(width, height).masks,
+                                                   dtype=np.uint64)
+    return masks
+
+
+def _popcount(values):
+    """ Count the set bits of every element of an array of uint64 masks. """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    counts = np.zeros(values.shape, dtype=np.int64)
+    for shift in range(0, 64, 8):
+        counts += _BYTE_COUNTS[(values >> np.uint64(shift)) & np.uint64(0xff)]
+    return counts
+
+
+if AVAILABLE:
+    _BYTE_COUNTS = np.array([bin(value).count("1") for value in range(256)],
+                            dtype=np.int64)
+
+
+class PositionBatch(object):
+    """
+    A batch of game states of the same board geometry, evaluated from the
+    point of view of the same player.
+
+    Attributes
+    ----------
+    blocked : numpy.ndarray<uint64>
+        For every state, the mask of the blocked cells.
+
+    own : numpy.ndarray<int64>
+        For every state, the cell index of the evaluated player.
+
+    opponent : numpy.ndarray<int64>
+        For every state, the cell index of the opponent.
+
+    player_active : bool
+        Whether the evaluated player holds the initiative in every state.
+    """
+
+    def __init__(self, width, height, blocked, own, opponent, player_active):
+        self.width = width
+        self.height = height
+        self.blocked = blocked
+        self.own = own
+        self.opponent = opponent
+        self.player_active = player_active
+        self.__masks__ = _masks(width, height)
+        self.__mobility__ = None
+
+    def __len__(self):
+        return len(self.blocked)
+
+    @classmethod
+    def from_children(cls, game, moves, player):
+        """
+        Create the batch of the game states reached by applying each of the
+        moves to the game, from the point of view of the player.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The parent game state; the active player makes the moves.
+
+        moves : list<(int, int)>
+            The legal moves of the active player.
+
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        `PositionBatch` or None
+            The batch, or None if NumPy is not available, the board has more
+            than `MAX_CELLS` cells or a player is not placed in the children.
+        """
+        height = game.height
+        if not AVAILABLE or game.width * height > MAX_CELLS:
+            return None
+        waiting = game.get_player_location(game.inactive_player)
+        if waiting == Board.NOT_MOVED:
+            return None
+
+        blocked = blocked_mask(game)
+        cells = np.array([c * height + r for r, c in moves], dtype=np.int64)
+        children = np.uint64(blocked) | (np.uint64(1) << cells.astype(np.uint64))
+        waiting = np.full(len(moves), waiting[1] * height + waiting[0], dtype=np.int64)
+
+        # In the children, the player who moved waits on the moved-to cell.
+        if game.active_player == player:
+            return cls(game.width, height, children, cells, waiting, False)
+        return cls(game.width, height, children, waiting, cells, True)
+
+    def mobility(self):
+        """
+        Return the number of legal moves of the evaluated player and of its
+        opponent in every state, as two NumPy vectors.
+        """
+        if self.__mobility__ is None:
+            free = ~self.blocked
+            self.__mobility__ = (_popcount(self.__masks__[self.own] & free),
+                                 _popcount(self.__masks__[self.opponent] & free))
+        return self.__mobility__
+
+    def with_utility(self, scores):
+        """
+        Return the scores as a float vector, replaced by the utility of the
+        state for the evaluated player (see `isolation.Board.utility()`)
+        wherever the active player has no legal moves left.
+        """
+        own_moves, opp_moves = self.mobility()
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.player_active:
+            return np.where(own_moves == 0, -np.inf, scores)
+        return np.where(opp_moves == 0, np.inf, scores)
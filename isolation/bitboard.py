@@ -0,0 +1,280 @@
+"""
+This file contains the `BitBoard` class, an alternative implementation of the
+Isolation rules from `isolation.Board` that stores the game state in integer
+bitmasks instead of a list of lists.
+
+Cells are numbered in column-major order (index = col * height + row), which
+is the same order `Board.get_blank_spaces()` enumerates them, so both boards
+report moves in exactly the same order and can be swapped for each other
+without changing the behavior of any player.
+"""
+
+from .isolation import Board
+from .isolation import move_table
+from .isolation import zobrist_keys
+
+
+class BitBoard(Board):
+    """
+    Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, with the blocked cells and player locations encoded as
+    integer bitmasks.
+
+    The public API is identical to `isolation.Board`, so a `BitBoard` can be
+    used anywhere a `Board` is expected.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__blocked__ = 0
+        self.__positions__ = {player_1: 0, player_2: 0}
+        self.__steps__ = move_table(width, height).steps
+        self.__history__ = []
+        keys = zobrist_keys(width, height)
+        self.__cell_keys__ = keys.cells
+        self.__player_keys__ = {player_1: keys.players[1], player_2: keys.players[2]}
+        self.__side_key__ = keys.side
+        self.__hash_key__ = 0
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        new_board = BitBoard(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__blocked__ = self.__blocked__
+        new_board.__positions__ = self.__positions__.copy()
+        new_board.__history__ = self.__history__[:]
+        new_board.__hash_key__ = self.__hash_key__
+        return new_board
+
+    def transform(self, symmetry):
+        """
+        Return a copy of the current board with every cell mapped by the
+        given symmetry, including the locations of the players and the
+        history of moves that can be undone.
+
+        Parameters
+        ----------
+        symmetry : `Symmetry`
+            A symmetry of the board geometry (see `symmetries()`).
+
+        Returns
+        ----------
+        `isolation.BitBoard`
+            The transformed copy of the board.
+        """
+        cells = symmetry.cells
+
+        def image(mask):
+            mapped = 0
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                mapped |= 1 << cells[bit.bit_length() - 1]
+            return mapped
+
+        new_board = self.copy()
+        new_board.__blocked__ = image(self.__blocked__)
+        new_board.__positions__ = {player: image(position)
+                                   for player, position in self.__positions__.items()}
+        new_board.__history__ = [image(origin) for origin in self.__history__]
+        for key, mapped in self.__symmetric_hash_keys__():
+            if mapped is symmetry:
+                new_board.__hash_key__ = key
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self.__blocked__ >> (col * self.height + row) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        blocked = self.__blocked__
+        height = self.height
+        return [(idx % height, idx // height) for idx in range(self.width * height)
+                if not blocked >> idx & 1]
+
+    def get_player_location(self, player):
+        """
+        Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the input player.
+        """
+        position = self.__positions__[player]
+        if not position:
+            return Board.NOT_MOVED
+        idx = position.bit_length() - 1
+        return idx % self.height, idx // self.height
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        position = self.__positions__[player]
+        if not position:
+            return self.get_blank_spaces()
+        blocked = self.__blocked__
+        return [move for bit, move in self.__steps__[position.bit_length() - 1]
+                if not blocked & bit]
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        idx = col * self.height + row
+        bit = 1 << idx
+        origin = self.__positions__[self.__active_player__]
+        player_keys = self.__player_keys__[self.__active_player__]
+        hash_key = self.__hash_key__ ^ self.__cell_keys__[idx] ^ player_keys[idx] ^ self.__side_key__
+        if origin:
+            hash_key ^= player_keys[origin.bit_length() - 1]
+        self.__hash_key__ = hash_key
+        self.__history__.append(origin)
+        self.__positions__[self.__active_player__] = bit
+        self.__blocked__ |= bit
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def undo_move(self):
+        """
+        Revert the most recent move applied with `apply_move()`, restoring
+        the blocked cell, the location of the player who made the move and
+        the initiative.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the move that was undone.
+        """
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.get_player_location(self.__active_player__)
+        position = self.__positions__[self.__active_player__]
+        origin = self.__history__.pop()
+        idx = position.bit_length() - 1
+        player_keys = self.__player_keys__[self.__active_player__]
+        hash_key = self.__hash_key__ ^ self.__cell_keys__[idx] ^ player_keys[idx] ^ self.__side_key__
+        if origin:
+            hash_key ^= player_keys[origin.bit_length() - 1]
+        self.__hash_key__ = hash_key
+        self.__blocked__ ^= position
+        self.__positions__[self.__active_player__] = origin
+        self.move_count -= 1
+        return move
+
+    def __get_moves__(self, move):
+        """
+        Generate the list of possible moves for an L-shaped motion (like a
+        knight in chess).
+        """
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        r, c = move
+        blocked = self.__blocked__
+        return [dest for bit, dest in self.__steps__[c * self.height + r]
+                if not blocked & bit]
+
+    def print_board(self):
+        """
+        Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+
+        p1_r, p1_c = self.get_player_location(self.__player_1__)
+        p2_r, p2_c = self.get_player_location(self.__player_2__)
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+
+                if not self.__blocked__ >> (j * self.height + i) & 1:
+                    out += ' '
+                elif i == p1_r and j == p1_c:
+                    out += '1'
+                elif i == p2_r and j == p2_c:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -8,6 +8,7 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
 from copy import deepcopy
@@ -16,6 +17,193 @@ from copy import copy
 
 TIME_LIMIT_MILLIS = 200
 
+# Knight move offsets in the order that legal moves are reported.
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+
+class MoveTable(object):
+    """
+    Precomputed knight moves for a single board geometry. Cells are numbered
+    in column-major order (index = col * height + row), which is the order
+    `Board.get_blank_spaces()` enumerates them.
+
+    Attributes
+    ----------
+    destinations : tuple<tuple<(int, int)>>
+        For every cell index, the in-bounds knight destinations of the cell
+        in `DIRECTIONS` order.
+
+    steps : tuple<tuple<(int, (int, int))>>
+        For every cell index, (bit, (row, col)) pairs of the destinations,
+        where bit is the single-cell mask of the destination.
+
+    masks : tuple<int>
+        For every cell index, the bitmask of all destinations of the cell.
+
+    targets : tuple<tuple<(int, int)>>
+        For every cell index, (bit, index) pairs of the destinations, where
+        index is the cell index of the destination.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        destinations = []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            destinations.append(tuple((r + dr, c + dc) for dr, dc in DIRECTIONS
+                                      if 0 <= r + dr < height and 0 <= c + dc < width))
+        self.destinations = tuple(destinations)
+        self.steps = tuple(tuple((1 << (c * height + r), (r, c)) for r, c in dests)
+                           for dests in self.destinations)
+        self.masks = tuple(sum(bit for bit, _ in steps) for steps in self.steps)
+        self.targets = tuple(tuple((bit, bit.bit_length() - 1) for bit, _ in steps)
+                             for steps in self.steps)
+
+
+_MOVE_TABLES = {}
+
+
+def move_table(width, height):
+    """
+    Return the `MoveTable` for a board geometry. Tables are computed the
+    first time a geometry is requested and shared afterwards.
+    """
+    table = _MOVE_TABLES.get((width, height))
+    if table is None:
+        table = _MOVE_TABLES[(width, height)] = MoveTable(width, height)
+    return table
+
+
+def blocked_mask(game):
+    """
+    Return the bitmask of the blocked cells of a game, with cells numbered
+    like in `MoveTable`. Cells occupied by a player are blocked.
+    """
+    # A `BitBoard` holds the mask of the blocked cells already.
+    blocked = getattr(game, '__blocked__', None)
+    if blocked is not None:
+        return blocked
+    height = game.height
+    blocked = (1 << (game.width * height)) - 1
+    for r, c in game.get_blank_spaces():
+        blocked ^= 1 << (c * height + r)
+    return blocked
+
+
+class ZobristKeys(object):
+    """
+    Random keys used to hash the state of a board geometry. The hash of a
+    game state is the XOR of the keys of every blocked cell, of the location
+    of each player and, when player 2 holds the initiative, of `side`. The
+    keys are generated from a fixed seed so that hashes are reproducible.
+
+    Attributes
+    ----------
+    cells : tuple<int>
+        For every cell index, the key of the cell being blocked.
+
+    players : {1: tuple<int>, 2: tuple<int>}
+        For every player symbol and cell index, the key of the player being
+        located on the cell.
+
+    side : int
+        The key of player 2 holding the initiative.
+    """
+
+    def __init__(self, width, height):
+        rng = random.Random("zobrist-%dx%d" % (width, height))
+        size = width * height
+        self.cells = tuple(rng.getrandbits(64) for _ in range(size))
+        self.players = {1: tuple(rng.getrandbits(64) for _ in range(size)),
+                        2: tuple(rng.getrandbits(64) for _ in range(size))}
+        self.side = rng.getrandbits(64)
+
+
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """
+    Return the `ZobristKeys` for a board geometry. Keys are generated the
+    first time a geometry is requested and shared afterwards.
+    """
+    keys = _ZOBRIST_KEYS.get((width, height))
+    if keys is None:
+        keys = _ZOBRIST_KEYS[(width, height)] = ZobristKeys(width, height)
+    return keys
+
+
+class Symmetry(object):
+    """
+    A symmetry of a board geometry, i.e. a rotation or reflection that maps
+    the board onto itself. Knight moves are preserved by every symmetry, so
+    symmetric game states have the same game tree up to the symmetry.
+
+    Attributes
+    ----------
+    name : str
+        The name of the symmetry, e.g. 'identity' or 'rotate90'.
+
+    cells : tuple<int>
+        For every cell index, the index of the cell it is mapped to.
+    """
+
+    def __init__(self, name, width, height, transform):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.__transform__ = transform
+        self.cells = tuple(c * height + r for r, c in
+                           (transform(idx % height, idx // height)
+                            for idx in range(width * height)))
+        self.__inverse__ = {}
+        for idx, image in enumerate(self.cells):
+            self.__inverse__[image] = idx
+
+    def apply(self, move):
+        """ Map a (row, column) location to its symmetric location. """
+        if move == Board.NOT_MOVED:
+            return move
+        return self.__transform__(*move)
+
+    def invert(self, move):
+        """ Map a symmetric (row, column) location back to the original. """
+        if move == Board.NOT_MOVED:
+            return move
+        idx = self.__inverse__[move[1] * self.height + move[0]]
+        return idx % self.height, idx // self.height
+
+    def __repr__(self):
+        return "Symmetry(%r)" % self.name
+
+
+_SYMMETRIES = {}
+
+
+def symmetries(width, height):
+    """
+    Return the symmetries of a board geometry, starting with the identity:
+    the 8 rotations and reflections of a square board, or the 4 of them that
+    preserve the shape of a rectangular board.
+    """
+    table = _SYMMETRIES.get((width, height))
+    if table is None:
+        h, w = height - 1, width - 1
+        transforms = [("identity", lambda r, c: (r, c)),
+                      ("rotate180", lambda r, c: (h - r, w - c)),
+                      ("flip_rows", lambda r, c: (h - r, c)),
+                      ("flip_columns", lambda r, c: (r, w - c))]
+        if width == height:
+            transforms += [("rotate90", lambda r, c: (c, w - r)),
+                           ("rotate270", lambda r, c: (w - c, r)),
+                           ("transpose", lambda r, c: (c, r)),
+                           ("antitranspose", lambda r, c: (w - c, h - r))]
+        table = _SYMMETRIES[(width, height)] = tuple(
+            Symmetry(name, width, height, transform) for name, transform in transforms)
+    return table
+
 
 class Board(object):
     """
@@ -52,6 +240,21 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__destinations__ = move_table(width, height).destinations
+        self.__history__ = []
+        self.__zobrist__ = zobrist_keys(width, height)
+        self.__hash_key__ = 0
+
+    @property
+    def hash_key(self):
+        """
+        The Zobrist hash of the current game state, covering the blocked
+        cells, the location of both players and the player to move. It is
+        updated incrementally by `apply_move()` and `undo_move()`.
+        """
+        if len(self.__history__) != self.move_count:
+            self.__restore_history__()
+        return self.__hash_key__
 
     @property
     def active_player(self):
@@ -100,6 +303,8 @@ class Board(object):
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__history__ = copy(self.__history__)
+        new_board.__hash_key__ = self.__hash_key__
         return new_board
 
     def forecast_move(self, move):
@@ -122,6 +327,98 @@ class Board(object):
         new_board.apply_move(move)
         return new_board
 
+    def canonical_key(self):
+        """
+        Return the canonical key of the current game state, which is shared
+        by all symmetric game states, and the symmetry that maps this state
+        to its canonical form.
+
+        The key is the smallest `hash_key` among the symmetric images of the
+        game state. It is computed from scratch, so it is meant for lookups
+        once per move (e.g. opening books), not for every node of a search.
+
+        Returns
+        ----------
+        (int, `Symmetry`)
+            The canonical key and the symmetry of the canonical form.
+        """
+        best = None
+        for key, symmetry in self.__symmetric_hash_keys__():
+            if best is None or key < best[0]:
+                best = key, symmetry
+        return best
+
+    def canonical_form(self):
+        """
+        Return the canonical form of the current game state (see
+        `canonical_key()`) and the symmetry that maps this state to it.
+
+        Returns
+        ----------
+        (`isolation.Board`, `Symmetry`)
+            A transformed copy of the board and the symmetry applied to it.
+        """
+        _, symmetry = self.canonical_key()
+        return self.transform(symmetry), symmetry
+
+    def transform(self, symmetry):
+        """
+        Return a copy of the current board with every cell mapped by the
+        given symmetry, including the locations of the players and the
+        history of moves that can be undone.
+
+        Parameters
+        ----------
+        symmetry : `Symmetry`
+            A symmetry of the board geometry (see `symmetries()`).
+
+        Returns
+        ----------
+        `isolation.Board`
+            The transformed copy of the board.
+        """
+        self.__restore_history__()
+        new_board = self.copy()
+        for row in range(self.height):
+            for col in range(self.width):
+                r, c = symmetry.apply((row, col))
+                new_board.__board_state__[r][c] = self.__board_state__[row][col]
+        for player, move in self.__last_player_move__.items():
+            new_board.__last_player_move__[player] = symmetry.apply(move)
+        new_board.__history__ = [symmetry.apply(move) for move in self.__history__]
+        for key, image in self.__symmetric_hash_keys__():
+            if image is symmetry:
+                new_board.__hash_key__ = key
+        return new_board
+
+    def __symmetric_hash_keys__(self):
+        """
+        Compute the Zobrist hash of the image of the current game state under
+        every symmetry of the board, as a list of (hash, symmetry) pairs.
+        """
+        keys = zobrist_keys(self.width, self.height)
+        height = self.height
+        blocked = set(range(self.width * height))
+        for r, c in self.get_blank_spaces():
+            blocked.discard(c * height + r)
+        locations = []
+        for player, symbol in ((self.__player_1__, 1), (self.__player_2__, 2)):
+            location = self.get_player_location(player)
+            if location != Board.NOT_MOVED:
+                locations.append((keys.players[symbol], location[1] * height + location[0]))
+        side = keys.side if self.move_count % 2 else 0
+
+        hash_keys = []
+        for symmetry in symmetries(self.width, height):
+            cells = symmetry.cells
+            key = side
+            for idx in blocked:
+                key ^= keys.cells[cells[idx]]
+            for player_keys, idx in locations:
+                key ^= player_keys[cells[idx]]
+            hash_keys.append((key, symmetry))
+        return hash_keys
+
     def move_is_legal(self, move):
         """
         Test whether a move is legal in the current game state.
@@ -200,11 +497,66 @@ class Board(object):
         None
         """
         row, col = move
+        if len(self.__history__) != self.move_count:
+            self.__restore_history__()
+        self.__update_hash__(self.__last_player_move__[self.active_player], move)
+        self.__history__.append(self.__last_player_move__[self.active_player])
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def undo_move(self):
+        """
+        Revert the most recent move applied with `apply_move()`, restoring
+        the blocked cell, the location of the player who made the move and
+        the initiative.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the move that was undone.
+        """
+        if len(self.__history__) != self.move_count:
+            self.__restore_history__()
+        if self.__history__[-1] == Board.NOT_MOVED and self.move_count > 2:
+            raise RuntimeError("Moves played before the board was copied without its history cannot be undone.")
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.__last_player_move__[self.active_player]
+        row, col = move
+        self.__board_state__[row][col] = Board.BLANK
+        self.__last_player_move__[self.active_player] = self.__history__.pop()
+        self.__update_hash__(self.__last_player_move__[self.active_player], move)
+        self.move_count -= 1
+        return move
+
+    def __restore_history__(self):
+        """
+        Restore the move history and the Zobrist hash of a board copied by
+        the `copy()` method of a subclass that does not carry them over, i.e.
+        whose history is shorter than the number of moves. The hash is
+        recomputed from the game state, and the history is padded with
+        `NOT_MOVED`: the moves played before the copy cannot be undone,
+        except for the first move of each player.
+        """
+        missing = self.move_count - len(self.__history__)
+        if missing > 0:
+            self.__history__[:0] = [Board.NOT_MOVED] * missing
+            self.__hash_key__ = self.__symmetric_hash_keys__()[0][0]
+
+    def __update_hash__(self, origin, move):
+        """
+        Toggle the Zobrist hash for the active player moving from `origin`
+        to `move`. Applying the same update twice restores the hash.
+        """
+        keys = self.__zobrist__
+        player_keys = keys.players[self.__player_symbols__[self.active_player]]
+        idx = move[1] * self.height + move[0]
+        hash_key = self.__hash_key__ ^ keys.cells[idx] ^ player_keys[idx] ^ keys.side
+        if origin != Board.NOT_MOVED:
+            hash_key ^= player_keys[origin[1] * self.height + origin[0]]
+        self.__hash_key__ = hash_key
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -257,13 +609,10 @@ class Board(object):
             return self.get_blank_spaces()
 
         r, c = move
+        board_state = self.__board_state__
 
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
-
-        return valid_moves
+        return [(i, j) for i, j in self.__destinations__[c * self.height + r]
+                if board_state[i][j] == Board.BLANK]
 
     def print_board(self):
         """
@@ -299,7 +648,10 @@ class Board(object):
     def play(self, time_limit=TIME_LIMIT_MILLIS):
         """
         Execute a match between the players by alternately soliciting them
-        to select a move and applying it in the game.
+        to select a move and applying it in the game. After every move, the
+        player who has to move next is passed the move it received if it has
+        a `move_received(move)` method; the player is passed a copy of the
+        game with its next call to `get_move()`.
 
         Parameters
         ----------
@@ -346,3 +698,10 @@ class Board(object):
                 return self.__inactive_player__, move_history, "illegal move"
 
             self.apply_move(curr_move)
+
+            # Players may listen to the moves of their opponent, e.g. to stop
+            # searching on the opponent's time. Only the move is passed, so
+            # that the game is not copied twice per ply.
+            move_received = getattr(self.active_player, "move_received", None)
+            if move_received is not None:
+                move_received(curr_move)
@@ -0,0 +1,135 @@
+"""
+This file contains a rollout engine for Monte Carlo search, which plays games
+of Isolation to the end on integer bitmasks, without creating any `Board`.
+
+A game state is the triple (blocked, active, inactive): the bitmask of the
+blocked cells and the cell indices of the player to move and of the waiting
+player, with cells numbered like in `isolation.isolation.MoveTable`.
+
+Running this file measures the number of rollouts per second:
+
+    python -m isolation.rollout --policy greedy
+"""
+
+import argparse
+import random
+import timeit
+
+from .isolation import Board
+from .isolation import blocked_mask
+from .isolation import move_table
+
+POLICIES = ('random', 'greedy')
+
+
+def bitmask_state(game):
+    """
+    Return the (blocked, active, inactive) state of a game, or None if a
+    player has not been placed on the board yet.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game.
+    """
+    height = game.height
+    locations = []
+    for player in (game.active_player, game.inactive_player):
+        location = game.get_player_location(player)
+        if location == Board.NOT_MOVED:
+            return None
+        locations.append(location[1] * height + location[0])
+    return blocked_mask(game), locations[0], locations[1]
+
+
+def rollout(targets, blocked, active, inactive, policy='random', rng=random):
+    """
+    Play a game from the given state to the end, and return whether the
+    player to move in that state wins.
+
+    Parameters
+    ----------
+    targets : tuple<tuple<(int, int)>>
+        The `MoveTable.targets` of the board geometry.
+
+    blocked, active, inactive : int
+        The state of the game (see `bitmask_state()`).
+
+    policy : {'random', 'greedy'} (optional)
+        'random' plays uniformly random moves. 'greedy' plays the move that
+        leaves the moving player the most moves, breaking ties randomly.
+
+    rng : random.Random (optional)
+        The source of random numbers.
+
+    Returns
+    ----------
+    bool
+        True if the player to move in the given state wins the game.
+    """
+    greedy = policy == 'greedy'
+    first_to_move = True
+    while True:
+        options = [(bit, idx) for bit, idx in targets[active] if not blocked & bit]
+        if not options:
+            return not first_to_move
+
+        if greedy and len(options) > 1:
+            best = -1
+            candidates = []
+            for bit, idx in options:
+                free = blocked | bit
+                mobility = 0
+                for next_bit, _ in targets[idx]:
+                    if not free & next_bit:
+                        mobility += 1
+                if mobility > best:
+                    best = mobility
+                    candidates = [(bit, idx)]
+                elif mobility == best:
+                    candidates.append((bit, idx))
+            options = candidates
+
+        bit, idx = options[int(rng.random() * len(options))]
+        blocked |= bit
+        active, inactive = inactive, idx
+        first_to_move = not first_to_move
+
+
+def benchmark(width=7, height=7, policy='random', rollouts=10000, seed=0):
+    """
+    Measure the number of rollouts per second from a random position after
+    the opening moves of both players.
+
+    Returns
+    ----------
+    float
+        The number of rollouts per second.
+    """
+    rng = random.Random(seed)
+    targets = move_table(width, height).targets
+    cells = rng.sample(range(width * height), 2)
+    blocked = (1 << cells[0]) | (1 << cells[1])
+
+    start = timeit.default_timer()
+    for _ in range(rollouts):
+        rollout(targets, blocked, cells[0], cells[1], policy, rng)
+    return rollouts / (timeit.default_timer() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the rollouts per second.")
+    parser.add_argument("--policy", choices=POLICIES, default='random')
+    parser.add_argument("--rollouts", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    args = parser.parse_args()
+
+    rate = benchmark(args.width, args.height, args.policy, args.rollouts)
+    print("{} rollouts per second ({} policy, {}x{} board)".format(
+        int(rate), args.policy, args.width, args.height))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+This file contains the `GameBatch` class, which plays thousands of
+independent games of Isolation in lockstep with NumPy: the blocked cells of
+every game are stored as one unsigned 64 bit mask in a batch array, and every
+ply of all games is played with a few vectorized mask operations.
+
+The policies are equivalent to the sample players:
+
+    'random'    chooses a legal move uniformly, like `RandomPlayer`
+    'greedy'    maximizes `open_move_score`, like `GreedyPlayer`, and breaks
+                ties by the largest (row, col) move in the same way
+
+The simulator requires NumPy and boards of at most 64 cells. Running this
+file measures the number of games per second:
+
+    python -m isolation.simulator --games 100000 --policies greedy random
+"""
+
+import argparse
+import timeit
+
+from .batch import AVAILABLE
+from .batch import MAX_CELLS
+from .batch import _masks
+from .batch import _popcount
+
+if AVAILABLE:
+    import numpy as np
+
+POLICIES = ('random', 'greedy')
+
+
+class GameBatch(object):
+    """
+    A batch of games of Isolation of the same board geometry, all of which
+    are at the same ply. Games that ended are left untouched by later plies.
+
+    Cells are numbered like in `isolation.isolation.MoveTable`, i.e. the
+    move (row, col) is the cell index col * height + row.
+
+    Parameters
+    ----------
+    num_games : int
+        The number of games of the batch.
+
+    width, height : int (optional)
+        The size of the board.
+
+    Attributes
+    ----------
+    blocked : numpy.ndarray<uint64>
+        For every game, the mask of the blocked cells.
+
+    locations : numpy.ndarray<int64>
+        The cell index of player 1 (row 0) and player 2 (row 1) in every
+        game, or -1 if the player was not placed yet.
+
+    winner : numpy.ndarray<int8>
+        For every game, 0 if player 1 won, 1 if player 2 won, or -1 if the
+        game is not over.
+
+    history : numpy.ndarray<int8>
+        For every game, the cell index of every move in the order in which
+        the moves were played, padded with -1.
+
+    move_count : int
+        The number of plies played, including the plies of games that ended.
+    """
+
+    def __init__(self, num_games, width=7, height=7):
+        if not AVAILABLE:
+            raise ImportError("The game simulator requires NumPy")
+        cells = width * height
+        if cells > MAX_CELLS:
+            raise ValueError("The game simulator supports at most {} cells"
+                             .format(MAX_CELLS))
+
+        self.width = width
+        self.height = height
+        self.blocked = np.zeros(num_games, dtype=np.uint64)
+        self.locations = np.full((2, num_games), -1, dtype=np.int64)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.history = np.full((num_games, cells), -1, dtype=np.int8)
+        self.move_count = 0
+
+        self.__masks__ = _masks(width, height)
+        self.__full__ = np.uint64((1 << cells) - 1)
+        self.__bits__ = np.uint64(1) << np.arange(cells, dtype=np.uint64)
+        # The order of the moves (row, col) by which `GreedyPlayer` breaks
+        # ties, for every cell index.
+        index = np.arange(cells)
+        self.__rank__ = (index % height) * width + index // height
+
+    def __len__(self):
+        return len(self.blocked)
+
+    @property
+    def running(self):
+        """ The mask of the games that are not over. """
+        return self.winner < 0
+
+    def legal_moves(self):
+        """
+        Return the mask of the legal moves of the active player in every
+        game. A player who was not placed yet may move to any blank cell.
+        """
+        free = ~self.blocked & self.__full__
+        location = self.locations[self.move_count % 2]
+        placed = location >= 0
+        return np.where(placed, self.__masks__[np.maximum(location, 0)] & free, free)
+
+    def apply_moves(self, cells):
+        """
+        Apply a move to every game that is not over, and pass the initiative
+        to the other player. The moves must be legal.
+
+        Parameters
+        ----------
+        cells : numpy.ndarray<int64>
+            For every game, the cell index of the move; ignored for the games
+            that are over.
+        """
+        running = self.running
+        cells = np.asarray(cells, dtype=np.int64)[running]
+        self.blocked[running] |= self.__bits__[cells]
+        self.locations[self.move_count % 2, running] = cells
+        self.history[running, self.move_count] = cells
+        self.move_count += 1
+
+    def step(self, policy='random', rng=None):
+        """
+        Play one ply of every game that is not over with the policy. Games in
+        which the active player has no legal moves end instead.
+
+        Parameters
+        ----------
+        policy : {'random', 'greedy'} (optional)
+            The policy of the active player.
+
+        rng : numpy.random.Generator (optional)
+            The source of random numbers of the 'random' policy.
+
+        Returns
+        ----------
+        int
+            The number of games that are not over.
+        """
+        legal = self.legal_moves()
+        active = self.move_count % 2
+        self.winner[self.running & (legal == 0)] = 1 - active
+        running = self.running
+        if not running.any():
+            return 0
+
+        moves = ((legal[:, None] & self.__bits__) != 0)
+        if policy == 'random':
+            cells = self._random_moves(moves, rng or np.random.default_rng())
+        elif policy == 'greedy':
+            cells = self._greedy_moves(moves)
+        else:
+            raise ValueError("Unknown policy: {}".format(policy))
+
+        self.apply_moves(cells)
+        return int(running.sum())
+
+    def _random_moves(self, moves, rng):
+        """ Choose one of the legal moves of every game uniformly. """
+        counts = moves.sum(axis=1)
+        choice = (rng.random(len(counts)) * counts).astype(np.int64)
+        return np.argmax(np.cumsum(moves, axis=1) > choice[:, None], axis=1)
+
+    def _greedy_moves(self, moves):
+        """ Choose the legal move of every game that maximizes the number of
+        moves of the active player, or that leaves the opponent without
+        moves, like `GreedyPlayer` with `open_move_score`. """
+        cells = len(self.__bits__)
+        free = ~(self.blocked[:, None] | self.__bits__) & self.__full__
+        own_moves = _popcount(self.__masks__ & free)
+
+        opponent = self.locations[1 - self.move_count % 2]
+        opponent_mask = np.where(opponent >= 0, self.__masks__[np.maximum(opponent, 0)],
+                                 self.__full__)
+        winning = _popcount(opponent_mask[:, None] & free) == 0
+
+        # A winning move scores above any number of moves, and ties are
+        # broken by the order of the moves (row, col).
+        scores = np.where(winning, cells, own_moves)
+        keys = np.where(moves, scores * cells + self.__rank__, -1)
+        return np.argmax(keys, axis=1)
+
+    def play(self, policies=('random', 'random'), rng=None):
+        """
+        Play every game to the end, and return the winners.
+
+        Parameters
+        ----------
+        policies : (str, str) (optional)
+            The policies of player 1 and player 2 (see `POLICIES`).
+
+        rng : numpy.random.Generator (optional)
+            The source of random numbers of the 'random' policy.
+
+        Returns
+        ----------
+        numpy.ndarray<int8>
+            For every game, 0 if player 1 won or 1 if player 2 won.
+        """
+        rng = rng or np.random.default_rng()
+        while self.step(policies[self.move_count % 2], rng):
+            pass
+        return self.winner
+
+    def moves(self, game):
+        """ Return the moves (row, col) of a game in the order in which they
+        were played. """
+        return [(int(idx) % self.height, int(idx) // self.height)
+                for idx in self.history[game] if idx >= 0]
+
+
+def simulate(num_games, policies=('random', 'random'), width=7, height=7,
+             seed=None, batch_size=10000):
+    """
+    Play games in batches of at most `batch_size` games, and return the
+    fraction of the games won by player 1 and the mean number of moves of a
+    game.
+    """
+    rng = np.random.default_rng(seed)
+    wins = moves = 0
+    for start in range(0, num_games, batch_size):
+        games = GameBatch(min(batch_size, num_games - start), width, height)
+        wins += int((games.play(policies, rng) == 0).sum())
+        moves += int((games.history >= 0).sum())
+    return wins / num_games, moves / num_games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the games per second.")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--policies", nargs=2, choices=POLICIES,
+                        default=['random', 'random'])
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = timeit.default_timer()
+    win_rate, length = simulate(args.games, args.policies, args.width,
+                                args.height, args.seed)
+    elapsed = timeit.default_timer() - start
+
+    print("{} games per second ({} vs {}, {}x{} board)".format(
+        int(args.games / elapsed), args.policies[0], args.policies[1],
+        args.width, args.height))
+    print("Player 1 won {:.2f}% of the games, in {:.1f} moves on average".format(
+        100. * win_rate, length))
+
+
+if __name__ == "__main__":
+    main()
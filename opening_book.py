@@ -0,0 +1,106 @@
+"""
+Build an opening book for `game_agent.CustomPlayer` by searching the first
+plies of the game offline, far deeper than the time limit of a move allows
+during play.
+
+The book covers both sides. For every position in which the agent is to move
+within the first plies, the book holds the move chosen by a deep search; the
+book then follows that move and expands every reply of the opponent.
+Symmetric positions share a single entry, which is searched only once. The
+result is written to a compact binary file (see `game_agent.OpeningBook`),
+which the agent loads with the `book` parameter:
+
+    CustomPlayer(book="opening_book.bin")
+"""
+
+import argparse
+import timeit
+
+from isolation import BitBoard
+from game_agent import CustomPlayer
+from game_agent import OpeningBook
+from game_agent import custom_score
+
+OPPONENT = "opponent"
+
+
+def build_book(player, plies, width=7, height=7, time_limit=float("inf")):
+    """
+    Search every position in which the player is to move within the first
+    plies of a game, from both sides of the board.
+
+    Parameters
+    ----------
+    player : CustomPlayer
+        The agent searching the positions of the book.
+
+    plies : int
+        The number of plies (moves of either player) covered by the book.
+
+    width, height : int (optional)
+        The size of the board.
+
+    time_limit : float (optional)
+        The number of milliseconds the player may search every position.
+
+    Returns
+    ----------
+    dict
+        The book moves keyed by the canonical key of their position, in the
+        canonical form of the position.
+    """
+    entries = {}
+
+    def expand(game):
+        if game.move_count >= plies:
+            return
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            return
+
+        if game.active_player == player:
+            key, symmetry = game.canonical_key()
+            if key in entries:
+                return
+            start = timeit.default_timer()
+            time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+            move = player.get_move(game.copy(), legal_moves, time_left)
+            entries[key] = symmetry.apply(move)
+            expand(game.forecast_move(move))
+        else:
+            for move in legal_moves:
+                expand(game.forecast_move(move))
+
+    expand(BitBoard(player, OPPONENT, width, height))
+    expand(BitBoard(OPPONENT, player, width, height))
+    return entries
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="opening_book.bin",
+                        help="path of the book file (default: opening_book.bin)")
+    parser.add_argument("--plies", type=int, default=4,
+                        help="number of plies covered by the book (default: 4)")
+    parser.add_argument("--depth", type=int, default=9,
+                        help="depth of the search of every position (default: 9)")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    args = parser.parse_args()
+
+    player = CustomPlayer(search_depth=args.depth, score_fn=custom_score,
+                          iterative=False, method='alphabeta', inplace=True,
+                          tt_size=2**16, ordering=True)
+
+    start = timeit.default_timer()
+    entries = build_book(player, args.plies, args.width, args.height)
+    OpeningBook.write(args.output, args.width, args.height, entries)
+
+    print("Wrote {} positions to {} in {:.1f}s".format(
+        len(entries), args.output, timeit.default_timer() - start))
+
+
+if __name__ == "__main__":
+    main()
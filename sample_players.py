@@ -96,6 +96,24 @@ def improved_score(game, player):
     return float(own_moves - opp_moves)
 
 
+def open_move_score_batch(positions):
+    """Evaluate `open_move_score` on every state of an
+    `isolation.batch.PositionBatch` at once."""
+    own_moves, _ = positions.mobility()
+    return positions.with_utility(own_moves)
+
+
+def improved_score_batch(positions):
+    """Evaluate `improved_score` on every state of an
+    `isolation.batch.PositionBatch` at once."""
+    own_moves, opp_moves = positions.mobility()
+    return positions.with_utility(own_moves - opp_moves)
+
+
+open_move_score.batch = open_move_score_batch
+improved_score.batch = improved_score_batch
+
+
 class RandomPlayer():
     """Player that chooses a move randomly."""
 
@@ -19,7 +19,10 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
 import itertools
+import multiprocessing
+import os
 import random
 import warnings
 
@@ -31,6 +34,7 @@ from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
+from game_agent import NodeBudget
 from game_agent import custom_score
 
 NUM_MATCHES = 5  # number of matches against each opponent
@@ -57,13 +61,21 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, seed=None, time_limit=TIME_LIMIT):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If a seed is given, the random number generator is seeded with it before
+    the match, which makes the starting positions (and the random choices of
+    the agents) reproducible. The time limit per move is given in
+    milliseconds.
     """
+    if seed is not None:
+        random.seed(seed)
+
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
@@ -77,7 +89,7 @@ def play_match(player1, player2):
 
     # play both games and tally the results
     for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        winner, _, termination = game.play(time_limit=time_limit)
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -102,14 +114,69 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def init_worker(cpus, counter):
+    """
+    Initialize a worker process of a parallel tournament by pinning it to
+    its own CPU (where the platform supports it), so that concurrent matches
+    do not compete for the same core and skew the move timing.
+    """
+    with counter.get_lock():
+        idx = counter.value
+        counter.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpus[idx % len(cpus)]})
+
+
+def make_pool(processes=None):
+    """
+    Return a pool of worker processes that play matches in parallel, each
+    pinned to its own CPU by `init_worker`, or None if the matches are
+    played serially. By default, one process is started per CPU.
+
+    The number of processes is capped at the number of CPUs available, with
+    a warning, since workers pinned to the same CPU would compete for it.
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+        else list(range(os.cpu_count()))
+    if processes is None:
+        processes = len(cpus)
+    elif processes > len(cpus):
+        warnings.warn("Only {} CPUs are available, playing as many matches in "
+                      "parallel instead of {}".format(len(cpus), processes))
+        processes = len(cpus)
+    if processes <= 1:
+        return None
+    return multiprocessing.Pool(processes, init_worker,
+                                (cpus, multiprocessing.Value('i', 0)))
+
+
+def play_round(agents, num_matches, pool=None, seed=None, time_limit=TIME_LIMIT):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    If a pool of worker processes is given, the matches are played in
+    parallel; the results are tallied in the same order as serial play. The
+    workers are daemonic, so agents played this way must not start their own
+    search processes. If a seed is given, every match is seeded with a number
+    drawn from it.
     """
     agent_1 = agents[-1]
     wins = 0.
     total = 0.
 
+    # Every match of the round, in the order in which the results are tallied
+    rng = random.Random(seed)
+    matches = [(p1, p2, None if seed is None else rng.getrandbits(32), time_limit)
+               for agent_2 in agents[:-1]
+               for p1, p2 in itertools.permutations((agent_1.player, agent_2.player))
+               for _ in range(num_matches)]
+
+    if pool is not None:
+        pending = [pool.apply_async(play_match, match) for match in matches]
+        results = (result.get() for result in pending)
+    else:
+        results = (play_match(*match) for match in matches)
+
     print("\nPlaying Matches:")
     print("----------")
 
@@ -117,12 +184,12 @@ def play_round(agents, num_matches):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
 
         # Each player takes a turn going first
         for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
             for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
+                score_1, score_2 = next(results)
                 counts[p1] += score_1
                 counts[p2] += score_2
                 total += score_1 + score_2
@@ -137,6 +204,31 @@ def play_round(agents, num_matches):
 
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of matches played in parallel, each "
+                             "process pinned to its own CPU (default: 1)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed that makes the matches reproducible")
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="let the iterative deepening agents search a "
+                             "fixed number of nodes per move instead of "
+                             "playing under a time limit")
+    args = parser.parse_args()
+
+    # Under a node budget, the agents are not limited in time, so the results
+    # do not depend on the speed or load of the machine. The budget only
+    # applies to the iterative deepening agents: the fixed-depth agents
+    # always complete their search, which is deterministic without a time
+    # limit, and would play random moves if their search was cut short.
+    time_limit = TIME_LIMIT
+    if args.nodes:
+        time_limit = float("inf")
+
+    def budget():
+        return NodeBudget(args.nodes) if args.nodes else None
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
@@ -160,8 +252,10 @@ def main():
     # systems; i.e., the performance of the student agent is considered
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
-    test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
+    test_agents = [Agent(CustomPlayer(score_fn=improved_score, budget=budget(), **CUSTOM_ARGS), "ID_Improved"),
+                   Agent(CustomPlayer(score_fn=custom_score, budget=budget(), **CUSTOM_ARGS), "Student")]
+
+    pool = make_pool(args.processes)
 
     print(DESCRIPTION)
     for agentUT in test_agents:
@@ -171,12 +265,16 @@ def main():
         print("*************************")
 
         agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        win_ratio = play_round(agents, NUM_MATCHES, pool, args.seed, time_limit)
 
         print("\n\nResults:")
         print("----------")
         print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
 
+    if pool is not None:
+        pool.close()
+        pool.join()
+
 
 if __name__ == "__main__":
     main()
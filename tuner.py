@@ -0,0 +1,193 @@
+"""
+Tune the weights of `game_agent.WeightedScore` by self-play with SPSA
+(simultaneous perturbation stochastic approximation).
+
+Every iteration perturbs all weights at once in a random direction, and plays
+"fair" matches (see `tournament.play_match`) between an agent using the
+weights moved forward along the direction and an agent using the weights
+moved backward. The score difference of the two candidates estimates the
+gradient of the win rate along the direction, and the weights take a step
+along it. The matches of an iteration are played in parallel in a pool of
+worker processes.
+
+The result of every iteration (both candidates, their wins and the updated
+weights) is appended to a checkpoint file as a line of JSON, and an
+interrupted run resumes from the last line. The final weights are written to
+a JSON file, which the agent loads as its score function:
+
+    CustomPlayer(score_fn=WeightedScore.load("weights.json"))
+
+By default, the agents search a fixed number of nodes per move, so the
+results do not depend on the speed or load of the machine.
+"""
+
+import argparse
+import json
+import os
+import random
+
+from game_agent import CustomPlayer
+from game_agent import NodeBudget
+from game_agent import WeightedScore
+from tournament import make_pool
+from tournament import play_match
+
+TIME_LIMIT = float("inf")  # no time limit under a node budget
+
+
+def play_candidates(plus, minus, seed, nodes, time_limit=TIME_LIMIT):
+    """
+    Play a fair match between an agent with the weights `plus` and an agent
+    with the weights `minus`, and return the number of games each one won.
+    """
+    players = [CustomPlayer(score_fn=WeightedScore(**weights), method='alphabeta',
+                            iterative=True, budget=NodeBudget(nodes) if nodes else None)
+               for weights in (plus, minus)]
+    return play_match(players[0], players[1], seed, time_limit)
+
+
+def read_checkpoint(path):
+    """ Return the records of all iterations saved in the checkpoint file. """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def tune(weights, iterations, checkpoint=None, pool=None, matches=8, nodes=1000,
+         time_limit=TIME_LIMIT, step=0.05, perturbation=0.2, seed=None):
+    """
+    Tune the weights with SPSA, and return the tuned weights.
+
+    Parameters
+    ----------
+    weights : dict
+        The initial weights, keyed by the parameter names of `WeightedScore`.
+
+    iterations : int
+        The total number of iterations, including the iterations loaded from
+        the checkpoint file.
+
+    checkpoint : str (optional)
+        The path of the checkpoint file. If the file exists, tuning resumes
+        after its last iteration.
+
+    pool : multiprocessing.Pool (optional)
+        The worker processes that play the matches of an iteration.
+
+    matches : int (optional)
+        The number of fair matches (two games each) played per iteration.
+
+    nodes : int (optional)
+        The number of nodes the agents search per move; the agents play
+        under the time limit instead if the value is 0 or None.
+
+    time_limit : float (optional)
+        The number of milliseconds of every move.
+
+    step, perturbation : float (optional)
+        The initial gains of the step size and of the perturbation of SPSA,
+        which decay with the iterations. When resuming, the gains stored in
+        the checkpoint file are used instead.
+
+    seed : int (optional)
+        The seed of the perturbations and of the matches.
+
+    Returns
+    ----------
+    dict
+        The tuned weights.
+    """
+    names = sorted(weights)
+    theta = dict(weights)
+
+    # Standard SPSA gain sequences, with the stability constant at 10% of
+    # the iterations. A resumed run continues on the gain sequences of the
+    # checkpoint, even if the number of iterations changed.
+    stability = 0.1 * iterations
+    records = read_checkpoint(checkpoint)
+    if records:
+        theta = dict(records[-1]['weights'])
+        gains = records[-1]['gains']
+        step, perturbation, stability = \
+            gains['step'], gains['perturbation'], gains['stability']
+
+    for k in range(len(records), iterations):
+        rng = random.Random(None if seed is None else seed * 1000003 + k)
+        a_k = step / (k + 1 + stability) ** 0.602
+        c_k = perturbation / (k + 1) ** 0.101
+        delta = {name: rng.choice((-1, 1)) for name in names}
+        plus = {name: theta[name] + c_k * delta[name] for name in names}
+        minus = {name: theta[name] - c_k * delta[name] for name in names}
+
+        args = [(plus, minus, rng.getrandbits(32), nodes, time_limit)
+                for _ in range(matches)]
+        if pool is not None:
+            results = pool.starmap(play_candidates, args)
+        else:
+            results = [play_candidates(*arg) for arg in args]
+        wins_plus = sum(result[0] for result in results)
+        wins_minus = sum(result[1] for result in results)
+
+        # The score difference in [-1, 1] estimates the directional
+        # derivative of the win rate over the distance 2 * c_k.
+        difference = (wins_plus - wins_minus) / (2. * matches)
+        theta = {name: theta[name] + a_k * difference / (2 * c_k * delta[name])
+                 for name in names}
+
+        record = {'iteration': k, 'plus': plus, 'minus': minus,
+                  'wins_plus': wins_plus, 'wins_minus': wins_minus,
+                  'weights': theta,
+                  'gains': {'step': step, 'perturbation': perturbation,
+                            'stability': stability}}
+        if checkpoint:
+            with open(checkpoint, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        print("Iteration {:>4}: {} to {}  {}".format(
+            k + 1, wins_plus, wins_minus,
+            "  ".join("{}={:.3f}".format(name, theta[name]) for name in names)),
+            flush=True)
+
+    return theta
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=8,
+                        help="fair matches per iteration (default: 8)")
+    parser.add_argument("--nodes", type=int, default=1000,
+                        help="nodes searched per move, or 0 to play under "
+                             "--time-limit (default: 1000)")
+    parser.add_argument("--time-limit", type=float, default=150,
+                        help="milliseconds per move without a node budget")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="matches played in parallel (default: one per CPU)")
+    parser.add_argument("--checkpoint", default="tuner_checkpoint.jsonl")
+    parser.add_argument("--output", default="weights.json")
+    parser.add_argument("--seed", type=int, default=None)
+    for name, value in WeightedScore().weights.items():
+        parser.add_argument("--" + name, type=float, default=value,
+                            help="initial weight (default: {})".format(value))
+    args = parser.parse_args()
+
+    weights = {name: getattr(args, name) for name in WeightedScore.PARAMETERS}
+    time_limit = TIME_LIMIT if args.nodes else args.time_limit
+
+    pool = make_pool(args.processes)
+    try:
+        theta = tune(weights, args.iterations, args.checkpoint, pool, args.matches,
+                     args.nodes, time_limit, seed=args.seed)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    WeightedScore(**theta).save(args.output)
+    print("Wrote {} to {}".format(WeightedScore(**theta), args.output))
+
+
+if __name__ == "__main__":
+    main()